@@ -1,5 +1,5 @@
 from .chat_manager import ChatManager
-from .models import MessageRequest, ResponseMessage
+from .models import DeferredTTSResponse, MessageRequest, ResponseMessage
 from .session import ChatSession
 
-__all__ = ["ChatManager", "ChatSession", "MessageRequest", "ResponseMessage"]
+__all__ = ["ChatManager", "ChatSession", "DeferredTTSResponse", "MessageRequest", "ResponseMessage"]
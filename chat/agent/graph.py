@@ -1,49 +1,130 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+from threading import Event, Lock
 from typing import Literal
 
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AnyMessage,AIMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import Command, interrupt
 from termcolor import colored
 
-from chat.agent.prompts import get_system_prompt
+from chat.agent.prompts import get_prompt_input, get_system_prompt
 from chat.agent.state import AgentState
+from chat.agent.tool_cache import get_tool_cache
 from chat.agent.tools import (
     check_system_time,
     check_to_do_list,
     update_to_do_list
 )
 from config.settings import Settings
-from log_module.log_utils import TimeLogger
+from frontend.format_response import format_speakable_response, is_speakable
+from log_module.log_utils import TimeLogger, count_tokens
+from log_module.metrics import get_metrics
+from log_module.tracing import CLIENT, get_tracer
 
 VERBOSE = bool(int(Settings.VERBOSE))
 
-
-
-def filter_messages(all_messages: list):
-    def is_relevant_message(msg: AnyMessage, index: int, total_messages: int):
-        # Always keep last 3 messages
-        if index >= total_messages - 3:
-            return True
-
-        # # Exclude ToolMessage
-        # if isinstance(msg, ToolMessage):
-        #     return False
-
-        # # Exclude AIMessage with no content
-        # if isinstance(msg, AIMessage) and not msg.content:
-        #     return False
-
-        # Keep all other messages
-        return True
-
-    # Apply custom filtering
-    filtered_messages = [
-        msg
-        for idx, msg in enumerate(all_messages)
-        if is_relevant_message(msg, idx, len(all_messages))
-    ]
-    return filtered_messages
+INTERRUPT_PHRASE = {"EN":"&#x1F6D1; Double confirmation required. Would you like to continue the execution? (type 'yes'):",
+                    "ES": "&#x1F6D1; Se requiere doble confirmación. ¿Desea continuar con la ejecución? (escriba 'yes'):"}
+
+
+class _ToolRun:
+    """A tool call sent to the tool pool. Its timeout counts from when it starts running, not from the submission."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.started = Event()
+        self.deadline = None
+        self._lock = Lock()
+        self._finished = False
+        self._timed_out = False
+
+    def begin(self):
+        self.deadline = time.perf_counter() + self.timeout
+        self.started.set()
+
+    def finish(self) -> bool:
+        """The tool returned. False when the caller already gave up on it."""
+        with self._lock:
+            self._finished = not self._timed_out
+            return self._finished
+
+    def expire(self) -> bool:
+        """The deadline passed. False when the tool returned just in time."""
+        with self._lock:
+            self._timed_out = not self._finished
+            return self._timed_out
+
+
+
+def split_turns(all_messages: list) -> list[list]:
+    """
+    Split the history into turns, each starting with a HumanMessage. An AIMessage
+    with tool calls and its ToolMessages always end up in the same turn.
+    """
+    turns = []
+    for msg in all_messages:
+        if isinstance(msg, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return turns
+
+
+def filter_messages(
+    all_messages: list, max_tokens: int = 0, token_counter=count_tokens, start: int = 0, low_watermark: float = 0.75
+) -> tuple[list, int, int]:
+    """
+    Fit the history into a budget of `max_tokens` (0 keeps everything).
+
+    The window starts at message `start`, the value returned by the previous
+    call: between trims the history only grows at the end, so the prompt prefix
+    stays byte-identical and the model server can reuse its KV / prompt cache.
+    When the window overflows, the oldest turns are dropped until it fits in
+    `low_watermark` of the budget, which leaves room for several turns before
+    the next trim. The latest turn (with any pending tool call / ToolMessage
+    pairs) is always kept intact.
+
+    Returns (messages, tokens saved, new start).
+    """
+    if not max_tokens or not all_messages:
+        return list(all_messages), 0, 0
+
+    start = min(start, len(all_messages))
+    turns = split_turns(all_messages[start:])
+    tokens = [token_counter(turn) for turn in turns]
+
+    if sum(tokens) > max_tokens:
+        dropped = 0
+        while len(turns) - dropped > 1 and sum(tokens[dropped:]) > max_tokens * low_watermark:
+            dropped += 1
+        start += sum(len(turn) for turn in turns[:dropped])
+        turns = turns[dropped:]
+
+    saved = token_counter(all_messages[:start]) if start else 0
+    filtered_messages = [msg for turn in turns for msg in turn]
+    return filtered_messages, saved, start
+
+
+def format_transcript(messages: list, max_chars: int = 500) -> str:
+    """Plain text transcript of `messages` for the summary prompt (long contents are cut)."""
+    lines = []
+    for msg in messages:
+        content = msg.content.strip() if isinstance(msg.content, str) else str(msg.content)
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            content = (content + " " if content else "") + ", ".join(
+                f"[called {tool_call['name']}({tool_call['args']})]" for tool_call in msg.tool_calls
+            )
+        if not content:
+            continue
+        if len(content) > max_chars:
+            content = content[:max_chars] + "..."
+        speaker = {HumanMessage: "User", AIMessage: "Assistant", ToolMessage: "Tool"}.get(type(msg), "System")
+        lines.append(f"{speaker}: {content}")
+    return "\n".join(lines)
 
 
 # --------------------------
@@ -59,9 +140,21 @@ class Agent:
 
         main_graph = StateGraph(AgentState)
 
-        main_graph.add_node("LLM_assistant", self.LLM_node)
-        main_graph.add_node("tool_node", self.tool_node)
-        main_graph.add_node("final_response_node", self.final_response_node)
+        # Every node has a sync and an async implementation, so the same graph
+        # serves both graph.invoke and graph.ainvoke/astream.
+        main_graph.add_node(
+            "LLM_assistant",
+            RunnableLambda(self.LLM_node, afunc=self.aLLM_node, name="LLM_assistant"),
+            destinations=("tool_node", "final_response_node"),
+        )
+        main_graph.add_node(
+            "tool_node",
+            RunnableLambda(self.tool_node, afunc=self.atool_node, name="tool_node"),
+        )
+        main_graph.add_node(
+            "final_response_node",
+            RunnableLambda(self.final_response_node, afunc=self.afinal_response_node, name="final_response_node"),
+        )
 
 
         main_graph.add_edge(START, "LLM_assistant")
@@ -73,7 +166,9 @@ class Agent:
         # COMPILE GRAPH
         # --------------------------
 
+        self._builder = main_graph
         self.graph = main_graph.compile(checkpointer=checkpointer, debug=False)
+        self.agraph = None  # Compiled on demand with an async checkpointer (see compile_async)
 
         # --------------------------
         # CONFIGURE LLM MODEL
@@ -93,30 +188,80 @@ class Agent:
 
         self.llm_with_tools = llm.bind_tools(tools)  # MODEL WITH TOOLS
         self.language = language
+
+        # Sync tool calls of one message run concurrently in this pool
+        self._tool_executor = ThreadPoolExecutor(max_workers=Settings.TOOL_WORKERS, thread_name_prefix="tool")
+        # Tool results shared by every agent (the to-do list is global), None when disabled
+        self.tool_cache = get_tool_cache()
+
+    def compile_async(self, checkpointer):
+        """Compile the graph against an async checkpointer (e.g. AsyncSqliteSaver) for ainvoke/astream."""
+        self.agraph = self._builder.compile(checkpointer=checkpointer, debug=False)
+        return self.agraph
+
     # --------------------------
     # NODES
     # --------------------------
 
-    # LLM Assistant Node
-    def LLM_node(self, state: AgentState) -> Command[Literal["tool_node", "final_response_node"]]:
-        """Assistant node - LLM"""
-        
-        next_node = "final_response_node"
-        
-        timelog = TimeLogger(state.get("_timelog", []))
+    @staticmethod
+    def _timelog(config: RunnableConfig) -> TimeLogger:
+        """Step timings of the session running the graph (a throwaway one if it passed none)."""
+        return (config or {}).get("configurable", {}).get("timelog") or TimeLogger()
+
+    def _llm_input(self, state: AgentState) -> tuple[list, int, int]:
+        """
+        System prompt + conversation history fitted to CONTEXT_MAX_TOKENS.
+        Returns (messages, tokens saved, new `_window_start`).
+        """
+        system_messages = [SystemMessage(content=get_system_prompt(cdu="main", language = self.language))]
+
+        # Turns already compacted are replaced by their summary
+        summarized = state.get("_summarized", 0)
+        messages = state["_messages"][summarized:]
+        window_start = max(state.get("_window_start", 0) - summarized, 0)
+        if state.get("_summary"):
+            system_messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{state['_summary']}"))
+
+        max_tokens = Settings.CONTEXT_MAX_TOKENS
+        if max_tokens:
+            max_tokens = max(max_tokens - count_tokens(system_messages), 1)
 
         # Apply custom filtering
-        filtered_messages = filter_messages(state["_messages"])
-
-        messages_list = [
-            SystemMessage(content=get_system_prompt(cdu="main", language = self.language))
-        ] + filtered_messages
+        filtered_messages, saved_tokens, window_start = filter_messages(
+            messages, max_tokens=max_tokens, start=window_start
+        )
+
+        if VERBOSE and saved_tokens:
+            print(colored(f"✂️ Context window | KEPT: {len(filtered_messages)}/{len(messages)} messages | "
+                          f"SAVED: {saved_tokens} tokens", "light_magenta"))
+
+        return system_messages + filtered_messages, saved_tokens, summarized + window_start
+
+    @staticmethod
+    def _llm_attributes(messages: list) -> dict:
+        """Span attributes of an LLM request."""
+        return {
+            "gen_ai.request.model": Settings.MODEL_NAME,
+            "llm.messages": len(messages),
+            "llm.prompt_chars": sum(len(message.content) for message in messages if isinstance(message.content, str)),
+        }
 
-        # Call LLM
-        timelog.mark("LLM Start")
-        ai_message = self.llm_with_tools.invoke(messages_list)
-        timelog.mark("LLM End")
+    @staticmethod
+    def _usage_attributes(ai_message: AIMessage) -> dict:
+        """Span attributes of an LLM answer: token usage and size."""
+        usage = ai_message.usage_metadata or {}
+        return {
+            "gen_ai.usage.input_tokens": usage.get("input_tokens"),
+            "gen_ai.usage.output_tokens": usage.get("output_tokens"),
+            "gen_ai.usage.cached_tokens": (usage.get("input_token_details") or {}).get("cache_read"),
+            "llm.tool_calls": len(getattr(ai_message, "tool_calls", [])),
+            "llm.response_chars": len(ai_message.content) if isinstance(ai_message.content, str) else None,
+        }
 
+    def _llm_command(
+        self, ai_message: AIMessage, saved_tokens: int = 0, window_start: int = 0
+    ) -> Command:
+        """Route the LLM answer to the tools or to the final response."""
         # if VERBOSE:
         #     for i, msg in enumerate(filtered_messages): print(colored(f"{i} : {msg.content}\n", 'light_magenta'))
         #     print(colored(f"\n+ : New AIMessage > \n{message_to_dict(ai_message)["data"]["content"]}", 'light_magenta'))
@@ -125,137 +270,474 @@ class Agent:
         token_usage = {
             "input_tokens": ai_message.usage_metadata["input_tokens"],
             "output_tokens": ai_message.usage_metadata["output_tokens"],
+            "saved_tokens": saved_tokens,
+            # Prompt tokens served from the provider's prefix cache (OpenAI reports them, Ollama does not)
+            "cached_tokens": (ai_message.usage_metadata.get("input_token_details") or {}).get("cache_read", 0),
         }
 
+        get_metrics().tokens.inc(token_usage["input_tokens"], direction="input")
+        get_metrics().tokens.inc(token_usage["output_tokens"], direction="output")
+
         next_node = "tool_node" if ai_message.tool_calls else "final_response_node"
         update = {
             "_messages": [ai_message],
             "_token_usage": token_usage,
-            "_timelog": timelog.steps,
+            "_window_start": window_start,
         }
 
         return Command(goto=next_node, update=update)
 
-    # Tool Node
-    def tool_node(self, state: AgentState) -> Command:
+    # LLM Assistant Node
+    def LLM_node(
+        self, state: AgentState, config: RunnableConfig = None
+    ) -> Command[Literal["tool_node", "final_response_node"]]:
         """Assistant node - LLM"""
-        timelog = TimeLogger(state.get("_timelog", []))
-
+        timelog = self._timelog(config)
+        with get_tracer().span("llm_node") as node_span:
+            messages_list, saved_tokens, window_start = self._llm_input(state)
+            node_span.set({"context.saved_tokens": saved_tokens})
+
+            # Call LLM
+            timelog.mark("LLM Start")
+            with get_tracer().span("llm_call", self._llm_attributes(messages_list), kind=CLIENT) as span:
+                ai_message = self.llm_with_tools.invoke(messages_list)
+                span.set(self._usage_attributes(ai_message))
+            timelog.mark("LLM End")
+
+            return self._llm_command(ai_message, saved_tokens, window_start)
+
+    async def aLLM_node(
+        self, state: AgentState, config: RunnableConfig = None
+    ) -> Command[Literal["tool_node", "final_response_node"]]:
+        """Assistant node - LLM (async)"""
+        timelog = self._timelog(config)
+        with get_tracer().span("llm_node") as node_span:
+            messages_list, saved_tokens, window_start = self._llm_input(state)
+            node_span.set({"context.saved_tokens": saved_tokens})
+
+            # Call LLM
+            timelog.mark("LLM Start")
+            with get_tracer().span("llm_call", self._llm_attributes(messages_list), kind=CLIENT) as span:
+                ai_message = await self.llm_with_tools.ainvoke(messages_list)
+                span.set(self._usage_attributes(ai_message))
+            timelog.mark("LLM End")
+
+            return self._llm_command(ai_message, saved_tokens, window_start)
+
+    def _prepare_tool_call(self, tool_call: dict):
+        """Validate and confirm a tool call.
+
+        Returns (tool, None) when the tool must be invoked, or (None, command)
+        when the call is answered without running the tool (invalid tool,
+        alert during the confirmation, or cancelled by the user).
+        """
         chat_input = ""
-        last_ai_message = state["_messages"][-1]
         sensitive_tools = []
 
-        for tool_call in last_ai_message.tool_calls:
-            tool_message = ToolMessage(tool_call_id=tool_call["id"], content="")
-
-            tool = self.tool_map.get(
-                tool_call["name"]
-            )  # getting tool instance from the name
-
-
-            if tool is None:
-                tool_message = ToolMessage(
-                    tool_call_id=tool_call["id"],
-                    content=str(
-                        f"[LLM_node WARNING] {tool_call['name']} is not a valid tool. Do not expect a response from it."
-                    ),
-                )
-                error = f"{tool_call['name']} is not a valid tool call."
-                print(colored(f"\nTool Error: {error}", "red"))
-
-            else:
-                # Interrupt for tool call confirmation
-                if tool_call["name"] in sensitive_tools:
-                    
-                    INTERRUPT_PHRASE = {"EN":"&#x1F6D1; Double confirmation required. Would you like to continue the execution? (type 'yes'):",
-                                        "ES": "&#x1F6D1; Se requiere doble confirmación. ¿Desea continuar con la ejecución? (escriba 'yes'):"}
-                    
-                    chat_input = interrupt(
-                        INTERRUPT_PHRASE.get(self.language)
-                    )
-                    
-                if VERBOSE: print(colored(f"\nTool requested: {tool_call}", "green"))
+        tool = self.tool_map.get(
+            tool_call["name"]
+        )  # getting tool instance from the name
+
+        if tool is None:
+            tool_message = ToolMessage(
+                tool_call_id=tool_call["id"],
+                content=str(
+                    f"[LLM_node WARNING] {tool_call['name']} is not a valid tool. Do not expect a response from it."
+                ),
+            )
+            error = f"{tool_call['name']} is not a valid tool call."
+            print(colored(f"\nTool Error: {error}", "red"))
+            return None, Command(update={"_messages": [tool_message]})
+
+        # Interrupt for tool call confirmation
+        if tool_call["name"] in sensitive_tools:
+            chat_input = interrupt(
+                INTERRUPT_PHRASE.get(self.language)
+            )
+
+        if VERBOSE: print(colored(f"\nTool requested: {tool_call}", "green"))
+
+        # Alert detection during interrupt
+        if "[alert]" in chat_input.lower():
+            tool_message = ToolMessage(
+                tool_call_id=tool_call["id"],
+                content="An alert interrupted the tool calling.",
+            )
+            return None, Command(update={"_messages": [tool_message]})
+
+        # Tool call confirmed
+        if (tool_call["name"] not in sensitive_tools) or (
+            tool_call["name"] in sensitive_tools
+            and chat_input.lower() == "yes"
+        ):
+            return tool, None
+
+        # Tool call canceled
+        tool_message = ToolMessage(
+            tool_call_id=tool_call["id"],
+            content="The user cancelled the execution.",
+        )
+        return None, Command(update={"_messages": [tool_message]})
+
+    def _tool_config(self, state: AgentState) -> dict:
+        """Config passed to the tools: the public (non underscore) part of the state."""
+        return {
+            "configurable": {
+                "additional_field": {
+                    k: v
+                    for k, v in state.items()
+                    if not k.startswith("_")
+                }
+            }
+        }
+
+    def _tool_error_command(self, tool_call: dict, error: Exception) -> Command:
+        print(colored(f"\nTool Error: {error}", "red"))
+        tool_message = ToolMessage(tool_call_id=tool_call["id"], content="")
+        return Command(update={"_messages": [tool_message]})
+
+    def _tool_timeout_command(self, tool_call: dict, timeout: float) -> Command:
+        print(colored(f"\nTool Error: {tool_call['name']} timed out after {timeout:g}s", "red"))
+        tool_message = ToolMessage(tool_call_id=tool_call["id"], content="The tool did not answer in time.")
+        return Command(update={"_messages": [tool_message]})
+
+    @staticmethod
+    def _tool_timeout(tool_call: dict) -> float:
+        return Settings.TOOL_TIMEOUTS.get(tool_call["name"], Settings.TOOL_TIMEOUT)
+
+    def _prepare_tool_calls(self, state: AgentState) -> list:
+        """
+        Confirm every tool call of the last AI message, one after the other
+        (interrupts must happen in order). Returns (tool_call, tool, command)
+        per call: the tool to run, or the command that already answers it.
+        """
+        prepared = []
+        for tool_call in state["_messages"][-1].tool_calls:
+            tool, command = self._prepare_tool_call(tool_call)
+            prepared.append((tool_call, tool, command))
+        return prepared
+
+    @staticmethod
+    def _merge_commands(commands: list) -> Command:
+        """
+        One Command with the updates of every tool call, in call order: message
+        and tools-used lists are concatenated, other keys keep the last value.
+        """
+        update = {}
+        for command in commands:
+            if isinstance(command, ToolMessage):
+                command = Command(update={"_messages": [command]})
+            for key, value in (command.update or {}).items():
+                if key in ("_messages", "_tools_used"):
+                    update.setdefault(key, [])
+                    update[key] += value if isinstance(value, list) else [value]
+                else:
+                    update[key] = value
+        return Command(update=update)
+
+    def _tools_command(self, prepared: list, results: list, timelog: TimeLogger) -> Command:
+        """Record the latency of each tool call and merge the results."""
+        for (tool_call, tool, _), (_, latency) in zip(prepared, results):
+            if tool is not None:
+                timelog.record(f"Tool: {tool_call['name']}", latency)
+        timelog.mark("Tools End")
+
+        return self._merge_commands([command for command, _ in results])
+
+    def _cached_tool_command(self, tool_call: dict):
+        """(command, generation): the cached answer of the call, or None and the token to cache the new one."""
+        if self.tool_cache is None:
+            return None, None
+        generation = self.tool_cache.generation(tool_call["name"])
+        update = self.tool_cache.get(tool_call)
+        return (Command(update=update) if update is not None else None), generation
+
+    def _cache_tool_command(self, tool_call: dict, command, generation):
+        """Drop the results a write tool made stale and store the new result."""
+        if self.tool_cache is None:
+            return
+        self.tool_cache.invalidate(tool_call["name"])
+        if isinstance(command, Command) and command.update:
+            self.tool_cache.put(tool_call, command.update, generation)
+
+    @staticmethod
+    def _tool_attributes(tool_call: dict) -> dict:
+        """Span attributes of a tool call."""
+        return {
+            "gen_ai.tool.name": tool_call["name"],
+            "gen_ai.tool.call.id": tool_call["id"],
+            "tool.args_chars": len(str(tool_call.get("args", ""))),
+        }
 
+    @staticmethod
+    def _result_attributes(command, cached: bool) -> dict:
+        """Span attributes of a tool result: cache hit and size of the ToolMessage content."""
+        if isinstance(command, Command):
+            messages = (command.update or {}).get("_messages", [])
+            messages = messages if isinstance(messages, list) else [messages]
+        else:
+            messages = [command]
+        return {
+            "tool.cache_hit": cached,
+            "tool.result_chars": sum(len(str(message.content)) for message in messages if isinstance(message, ToolMessage)),
+        }
+
+    def _run_tool(self, tool, tool_call: dict, config: dict, run: _ToolRun):
+        run.begin()
+        start = time.perf_counter()
+        with get_tracer().span("tool", self._tool_attributes(tool_call)) as span:
+            command, generation = self._cached_tool_command(tool_call)
+            cached = command is not None
+            if command is None:
                 try:
-                    # Alert detection during interrupt
-                    if "[alert]" in chat_input.lower():
-                        tool_message = ToolMessage(
-                            tool_call_id=tool_call["id"],
-                            content="An alert interrupted the tool calling.",
-                        )
-                        raise AlertException()
-
-                    # Tool call confirmed
-                    if (tool_call["name"] not in sensitive_tools) or (
-                        tool_call["name"] in sensitive_tools
-                        and chat_input.lower() == "yes"
-                    ):
-                        timelog.mark(f"Tool Invoke Start: {tool_call['name']}")
-                        command = tool.invoke(
-                            input=tool_call,
-                            config={
-                                "configurable": {
-                                    "additional_field": {
-                                        k: v
-                                        for k, v in state.items()
-                                        if not k.startswith("_")
-                                    }
-                                }
-                            },
-                        )
-                        timelog.mark(f"Tool Invoke End: {tool_call['name']}")
-
-                    # Tool call canceled
-                    else:
-                        tool_message = ToolMessage(
-                            tool_call_id=tool_call["id"],
-                            content="The user cancelled the execution.",
-                        )
-                        command = Command(
-                            update={"_messages": [tool_message]}
-                        )
-
-                except AlertException:
-                    command = Command(
-                        update={"_messages": [tool_message]}
-                    )
-
-                except Exception as e:
-                    print(colored(f"\nTool Error: {e}", "red"))
-                    command = Command(
-                        update={"_messages": [tool_message]}
-                    )
-
-        return command
-    
-    # LLM Assistant Node
-    def final_response_node(self, state: AgentState) -> Command:
-        """Assistant node - LLM"""
-        
-        
+                    command = tool.invoke(input=tool_call, config=config)
+                finally:
+                    # A call that timed out still invalidates what it wrote, its result is not cached
+                    self._cache_tool_command(tool_call, command if run.finish() else None, generation)
+            span.set(self._result_attributes(command, cached))
+        return command, time.perf_counter() - start
+
+    def _tool_result(self, tool_call: dict, future, run: _ToolRun):
+        """(command, latency) of a call sent to the pool, or the timeout / error command answering it."""
+        # Time spent queued behind the calls of other sessions does not count
+        run.started.wait()
+        remaining = run.deadline - time.perf_counter() if run.deadline is not None else 0
         try:
-            # Apply custom filtering
-            original_ai_message = state["_messages"][-1]
-
-            if not isinstance(original_ai_message, AIMessage):
-                raise Exception("The last message is not an AIMessage.")
-            if not original_ai_message.content.strip():
-                raise Exception("The last AIMessage content is empty.")
-            
-            
-            llm_input = get_system_prompt(cdu='tts', language = self.language, input = original_ai_message.content)
-            
-             # Call LLM
-            response = self.llm.invoke(llm_input)
-            tts_string = response.content.strip()
-            
+            try:
+                return future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                if run.expire():
+                    future.cancel()
+                    return self._tool_timeout_command(tool_call, run.timeout), run.timeout
+                return future.result()  # the tool returned just in time
         except Exception as e:
-            tts_string = ""
-            print(colored(f"\nFinal Response Error: {e}", "red"))
-        
+            return self._tool_error_command(tool_call, e), 0.0
+
+    # Tool Node
+    def tool_node(self, state: AgentState, config: RunnableConfig = None) -> Command:
+        """Assistant node - Tools (independent tool calls run concurrently in a thread pool)"""
+        timelog = self._timelog(config)
+        prepared = self._prepare_tool_calls(state)
+        config = self._tool_config(state)
+
+        timelog.mark("Tools Start")
+        with get_tracer().span("tool_node", {"tool.calls": len(prepared)}):
+            # Each call runs in a copy of this context: its span is a child of tool_node
+            calls = []
+            for tool_call, tool, _ in prepared:
+                if tool is None:
+                    calls.append(None)
+                    continue
+                run = _ToolRun(self._tool_timeout(tool_call))
+                future = self._tool_executor.submit(copy_context().run, self._run_tool, tool, tool_call, config, run)
+                future.add_done_callback(lambda _, run=run: run.started.set())  # cancelled before it started
+                calls.append((future, run))
+
+            results = [
+                self._tool_result(tool_call, *call) if call is not None else (command, 0.0)
+                for (tool_call, _, command), call in zip(prepared, calls)
+            ]
+
+            return self._tools_command(prepared, results, timelog)
+
+    async def _arun_tool(self, tool, tool_call: dict, config: dict):
+        start = time.perf_counter()
+        timeout = self._tool_timeout(tool_call)
+        with get_tracer().span("tool", self._tool_attributes(tool_call)) as span:
+            command, generation = self._cached_tool_command(tool_call)
+            if command is not None:
+                span.set(self._result_attributes(command, True))
+                return command, time.perf_counter() - start
+            try:
+                command = await asyncio.wait_for(tool.ainvoke(input=tool_call, config=config), timeout=timeout)
+                self._cache_tool_command(tool_call, command, generation)
+            except asyncio.TimeoutError:
+                command = self._tool_timeout_command(tool_call, timeout)
+                self._cache_tool_command(tool_call, None, generation)
+                span.set({"tool.timeout": True})
+            except Exception as e:
+                command = self._tool_error_command(tool_call, e)
+                self._cache_tool_command(tool_call, None, generation)
+                span.fail(e)
+            span.set(self._result_attributes(command, False))
+        return command, time.perf_counter() - start
+
+    async def atool_node(self, state: AgentState, config: RunnableConfig = None) -> Command:
+        """Assistant node - Tools (async, independent tool calls run concurrently)"""
+        timelog = self._timelog(config)
+        prepared = self._prepare_tool_calls(state)
+        config = self._tool_config(state)
+
+        async def answered(command):
+            return command, 0.0
+
+        timelog.mark("Tools Start")
+        with get_tracer().span("tool_node", {"tool.calls": len(prepared)}):
+            results = await asyncio.gather(*(
+                self._arun_tool(tool, tool_call, config) if tool is not None else answered(command)
+                for tool_call, tool, command in prepared
+            ))
+
+            return self._tools_command(prepared, list(results), timelog)
+
+    def close(self):
+        """Stop the tool pool."""
+        self._tool_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _last_ai_message(self, state: AgentState) -> AIMessage:
+        """Last AI message, the one to be spoken."""
+        original_ai_message = state["_messages"][-1]
+
+        if not isinstance(original_ai_message, AIMessage):
+            raise Exception("The last message is not an AIMessage.")
+        if not original_ai_message.content.strip():
+            raise Exception("The last AIMessage content is empty.")
+
+        return original_ai_message
+
+    def _tts_input(self, state: AgentState) -> list:
+        """TTS refinement prompt (cached system prompt) + the last AI message."""
+        original_ai_message = self._last_ai_message(state)
+        return [
+            SystemMessage(content=get_system_prompt(cdu='tts', language = self.language)),
+            HumanMessage(content=get_prompt_input(cdu='tts', input = original_ai_message.content)),
+        ]
+
+    def _fast_tts_text(self, state: AgentState) -> str:
+        """
+        TTS text built locally when the last AI message is already short, plain prose.
+        Returns "" when the message needs the LLM refinement.
+        """
+        max_words = Settings.TTS_FAST_PATH_MAX_WORDS
+        content = self._last_ai_message(state).content
+        tts_string = format_speakable_response(content) if max_words and is_speakable(content, max_words=max_words) else ""
+        get_metrics().tts_texts.inc(path="skipped" if tts_string else "refined")
+        return tts_string
+
+    # LLM Assistant Node
+    def final_response_node(self, state: AgentState, config: RunnableConfig = None) -> Command:
+        """Assistant node - LLM"""
+        timelog = self._timelog(config)
+        timelog.mark("Final Response Start")
+        with get_tracer().span("final_response_node") as node_span:
+            try:
+                # Plain answers are spoken as they are, no LLM call
+                tts_string = self._fast_tts_text(state)
+                node_span.set({"tts.fast_path": bool(tts_string)})
+
+                if not tts_string:
+                    llm_input = self._tts_input(state)
+
+                    # Call LLM
+                    with get_tracer().span("tts_refinement", self._llm_attributes(llm_input), kind=CLIENT) as span:
+                        response = self.llm.invoke(llm_input)
+                        span.set(self._usage_attributes(response))
+                    tts_string = response.content.strip()
+
+            except Exception as e:
+                tts_string = ""
+                node_span.fail(e)
+                print(colored(f"\nFinal Response Error: {e}", "red"))
+            node_span.set({"tts.text_chars": len(tts_string)})
+        timelog.mark("Final Response End")
 
         update = {
             "_tts_text": tts_string
             }
 
         return Command(update=update)
+
+    async def afinal_response_node(self, state: AgentState, config: RunnableConfig = None) -> Command:
+        """Assistant node - LLM (async)"""
+        timelog = self._timelog(config)
+        timelog.mark("Final Response Start")
+        with get_tracer().span("final_response_node") as node_span:
+            try:
+                # Plain answers are spoken as they are, no LLM call
+                tts_string = self._fast_tts_text(state)
+                node_span.set({"tts.fast_path": bool(tts_string)})
+
+                if not tts_string:
+                    llm_input = self._tts_input(state)
+
+                    # Call LLM
+                    with get_tracer().span("tts_refinement", self._llm_attributes(llm_input), kind=CLIENT) as span:
+                        response = await self.llm.ainvoke(llm_input)
+                        span.set(self._usage_attributes(response))
+                    tts_string = response.content.strip()
+
+            except Exception as e:
+                tts_string = ""
+                node_span.fail(e)
+                print(colored(f"\nFinal Response Error: {e}", "red"))
+            node_span.set({"tts.text_chars": len(tts_string)})
+        timelog.mark("Final Response End")
+
+        update = {
+            "_tts_text": tts_string
+            }
+
+        return Command(update=update)
+
+    # --------------------------
+    # COMPACTION
+    # --------------------------
+
+    def _compaction_input(self, state: AgentState):
+        """
+        Summary prompt for the turns to compact and the new `_summarized` index,
+        or None while the uncompacted history is under COMPACTION_THRESHOLD_TOKENS.
+        The last COMPACTION_KEEP_TURNS turns are never compacted.
+        """
+        threshold = Settings.COMPACTION_THRESHOLD_TOKENS
+        if not threshold:
+            return None
+
+        start = state.get("_summarized", 0)
+        messages = state.get("_messages", [])[start:]
+        turns = split_turns(messages)
+        keep = Settings.COMPACTION_KEEP_TURNS
+        old_turns = turns[:-keep] if keep else turns
+        if not old_turns or count_tokens(messages) < threshold:
+            return None
+
+        old_messages = [msg for turn in old_turns for msg in turn]
+        summary_input = (
+            f"Current summary:\n{state.get('_summary') or '(empty)'}\n\n"
+            f"Next turns:\n{format_transcript(old_messages)}"
+        )
+        llm_input = [
+            SystemMessage(content=get_system_prompt(cdu='summary', language = self.language)),
+            HumanMessage(content=get_prompt_input(cdu='summary', input = summary_input)),
+        ]
+        return llm_input, start + len(old_messages)
+
+    def _compaction_update(self, summary: str, summarized: int) -> dict:
+        if not summary:
+            print(colored("\nCompaction Error: empty summary", "red"))
+            return {}
+        if VERBOSE:
+            print(colored(f"🗜️ Conversation compacted | SUMMARIZED: {summarized} messages", "light_magenta"))
+        return {"_summary": summary, "_summarized": summarized}
+
+    def compact(self, state: AgentState) -> dict:
+        """
+        Summarize the older turns of the conversation into `_summary`. Meant to run
+        off the critical path, after the turn. Returns the state update ({} if
+        there is nothing to compact).
+        """
+        compaction = self._compaction_input(state)
+        if compaction is None:
+            return {}
+        llm_input, summarized = compaction
+        response = self.llm.invoke(llm_input)
+        return self._compaction_update(response.content.strip(), summarized)
+
+    async def acompact(self, state: AgentState) -> dict:
+        """Async version of `compact`."""
+        compaction = self._compaction_input(state)
+        if compaction is None:
+            return {}
+        llm_input, summarized = compaction
+        response = await self.llm.ainvoke(llm_input)
+        return self._compaction_update(response.content.strip(), summarized)
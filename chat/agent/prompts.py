@@ -1,6 +1,12 @@
+from functools import lru_cache
+
 LANGUAGES = {"EN": "English", "ES": "Spanish"}
 
-def get_system_prompt(cdu:str='main', language:str = "EN", input:str=''):
+# Prompts are built once per (cdu, language): a byte-identical prefix lets the
+# model server reuse its KV / prompt cache across calls. Per-call input goes in
+# a separate message (see get_prompt_input).
+@lru_cache(maxsize=None)
+def get_system_prompt(cdu:str='main', language:str = "EN"):
                    
     main_prompt = f"""
     You name is assistant.ai, an personal assistant built to support the user in he or she they might need.
@@ -8,7 +14,7 @@ def get_system_prompt(cdu:str='main', language:str = "EN", input:str=''):
 
     Your authorized functions include:
     1. **Check system time**: Call the tool `check_system_time` only when explicitly needed to retrieve the current time.
-    2. **Check to to-do list**: Call the tool `check_to_do_list` only when explicitly needed to retrieve the list of tasks.
+    2. **Check to to-do list**: Call the tool `check_to_do_list` only when explicitly needed to retrieve the list of tasks. Use its filters (status, due dates, text) and pages to retrieve only the tasks you need.
     3. **Add task to to-do list**: you might need to save certain tasks to a to do list. Use the tool `update_to_do_list` to do so.
     4. **Direct Support**: You may answer questions directly **without tool usage** if the answer is already clear from context.
     5. **External Alerts detection**: Detect external alert messages that start with [alert]. This alerts should be used to notify the user inmediatelly. Ask what to do next.
@@ -61,6 +67,7 @@ def get_system_prompt(cdu:str='main', language:str = "EN", input:str=''):
     Do NOT include any <think> </think> tags.
     Do NOT include the final response between any characters like <> or ''. Just the text.
     Always respond in {LANGUAGES.get(language, "English")}
+    The message to refine is given after "Input:".
 
     Examples:
     <example>
@@ -89,12 +96,28 @@ def get_system_prompt(cdu:str='main', language:str = "EN", input:str=''):
     TTS Output: "The coordinates are 71, -16. The supermarket is located at 78, -26."
     </example>
 
-    Input: {input}
+    /no_think
+    """
+
+    summary_prompt = f"""
+    You are an AI responsible for compacting the memory of a personal assistant.
+    You will receive the current summary of the conversation (it may be empty) and the next turns of the conversation.
+    Write a new summary that merges both, so the assistant can continue the conversation without the original turns.
+    Keep: user facts and preferences, requests and their outcome, tasks added or checked in the to-do list, pending questions and alerts.
+    Drop: greetings, tool chatter, full listings and any detail that can be retrieved again with a tool.
+    Write short plain sentences, no more than 150 words. Do not invent anything.
+    Always respond in {LANGUAGES.get(language, "English")}
 
     /no_think
     """
 
-    system_prompt = main_prompt.strip() if cdu == 'main' else tts_prompt.strip()
+    prompts = {'main': main_prompt, 'tts': tts_prompt, 'summary': summary_prompt}
+    system_prompt = prompts.get(cdu, tts_prompt).strip()
     
         
     return system_prompt
+
+
+def get_prompt_input(cdu:str='tts', input:str=''):
+    """Per-call input of the `tts` and `summary` prompts, sent after the cached system prompt."""
+    return f"Input: {input}" if cdu == 'tts' else input
@@ -16,14 +16,18 @@ def add(left, right):
 class TokenUsage(TypedDict):
     input_tokens : int
     output_tokens : int
+    saved_tokens : int  # history tokens left out of the context window
+    cached_tokens : int  # prompt tokens read from the model server prefix cache
     
 # State:
 class AgentState(TypedDict, total = False):
     _messages : Annotated[List[AnyMessage], add_messages]
     _token_usage: TokenUsage
-    _timelog: list[dict]
     _tools_used: Annotated[list[str], add]
     _tts_text: str
+    _summary: str  # rolling summary of the compacted turns
+    _summarized: int  # number of leading _messages covered by _summary
+    _window_start: int  # first message of the context window (moves forward on trims only)
     check_system_time_result: str
     last_task: str
     
@@ -0,0 +1,131 @@
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from langchain_core.messages import ToolMessage
+
+from config.settings import Settings
+
+# Tools whose results a write tool makes stale
+INVALIDATES = {
+    "update_to_do_list": ("check_to_do_list",),
+}
+
+
+class ToolResultCache:
+    """
+    Cache of tool results (the state update of the tool Command), keyed on the
+    tool name and its arguments. Only tools with a TTL are cached.
+
+    Entries live until the end of the current TTL window of the wall clock, so
+    a 60 s TTL follows the minute (check_system_time answers with minute
+    resolution). Running a write tool drops the entries of the tools it makes
+    stale (INVALIDATES), and a result computed while such a write was running
+    is not stored.
+    """
+
+    def __init__(self, ttls: dict, max_entries: int = 128, invalidates: Optional[dict] = None):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.invalidates = INVALIDATES if invalidates is None else invalidates
+
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._generations: dict = {}  # tool name -> number of invalidations
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(name: str, args: dict) -> str:
+        return f"{name}:{json.dumps(args, sort_keys=True, default=str)}"
+
+    def cacheable(self, name: str) -> bool:
+        return self.ttls.get(name, 0) > 0
+
+    def generation(self, name: str) -> int:
+        """Token to pass to `put`, taken before running the tool."""
+        with self._lock:
+            return self._generations.get(name, 0)
+
+    def get(self, tool_call: dict) -> Optional[dict]:
+        """State update cached for this call, with its ToolMessages bound to the call id."""
+        if not self.cacheable(tool_call["name"]):
+            return None
+        key = self.key(tool_call["name"], tool_call["args"])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            update = entry[1]
+
+        return {
+            **update,
+            "_messages": [
+                msg.model_copy(update={"tool_call_id": tool_call["id"]}) if isinstance(msg, ToolMessage) else msg
+                for msg in update.get("_messages", [])
+            ],
+        }
+
+    def put(self, tool_call: dict, update: dict, generation: int):
+        """Store the update of a call, unless the tool was invalidated since `generation`."""
+        name = tool_call["name"]
+        if not self.cacheable(name):
+            return
+        ttl = self.ttls[name]
+        expires = (time.time() // ttl + 1) * ttl
+        with self._lock:
+            if self._generations.get(name, 0) != generation:
+                return
+            key = self.key(name, tool_call["args"])
+            self._entries[key] = (expires, dict(update))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name: str):
+        """Drop the entries made stale by a run of the tool `name` (if it writes)."""
+        stale = self.invalidates.get(name, ())
+        if not stale:
+            return
+        with self._lock:
+            for tool_name in stale:
+                self._generations[tool_name] = self._generations.get(tool_name, 0) + 1
+            for key in [key for key in self._entries if key.split(":", 1)[0] in stale]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+_cache: Optional[ToolResultCache] = None
+_cache_lock = Lock()
+
+
+def get_tool_cache() -> Optional[ToolResultCache]:
+    """Process-wide tool result cache (None when disabled with TOOL_CACHE_SIZE=0)."""
+    global _cache
+    if not Settings.TOOL_CACHE_SIZE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolResultCache(Settings.TOOL_CACHE_TTLS, max_entries=Settings.TOOL_CACHE_SIZE)
+        return _cache
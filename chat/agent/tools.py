@@ -4,10 +4,16 @@ from langchain_core.messages import ToolMessage
 from langgraph.types import Command
 from typing import Annotated
 from termcolor import colored
-import json
 from config import Settings
 from datetime import datetime
-import uuid
+from services.to_do_list.store import get_to_do_store
+
+def format_task(task: dict) -> str:
+    """One line per task: the model reads it with far fewer tokens than JSON."""
+    line = f"- [{'x' if task['Completed'] else ' '}] {task['taskDescription']}"
+    if task["dueDate"] != "never":
+        line += f" (due {task['dueDate']})"
+    return line
 
 # --------------------------
 # TOOLS
@@ -37,22 +43,54 @@ def check_system_time(tool_call_id: Annotated[str, InjectedToolCallId]) -> Comma
     return Command(update=update)
 
 @tool
-def check_to_do_list(tool_call_id: Annotated[str, InjectedToolCallId]) -> Command:
-    """Use this tool to check the to-do list items.
+def check_to_do_list(
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    status: str = "open",
+    due_before: str = "",
+    due_after: str = "",
+    text: str = "",
+    page: int = 1,
+) -> Command:
+    """Use this tool to check the to-do list items. Ask only for what you need.
     
-    Arguments: None
+    Arguments (all optional):
+        - status:str 'open' (default), 'completed' or 'all'
+        - due_before:str Only tasks due before this date, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+        - due_after:str Only tasks due after this date, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM'
+        - text:str Only tasks whose description contains this text
+        - page:int Page of results, starting at 1
         
     Output:
-        - To-do list. Each item is a task.
-    """
-    
-    with open("services/to_do_list/to_do_list.json") as file:
-        to_do_list = json.load(file)
-    
-    content = f"""
-    To-do list:
-    {json.dumps(to_do_list, indent=2)}
+        - To-do list. One task per line: '- [ ]' open, '- [x]' completed, with its due date if any.
     """
+    page_size = Settings.TO_DO_LIST_PAGE_SIZE
+    page = max(int(page), 1)
+    try:
+        tasks, total = get_to_do_store().query_tasks(
+            status=status,
+            due_before=due_before or None,
+            due_after=due_after or None,
+            text=text or None,
+            limit=page_size,
+            offset=(page - 1) * page_size,
+        )
+    except ValueError as e:
+        # Invalid arguments: the message tells the model how to fix them
+        tasks, total, error = [], 0, str(e)
+    else:
+        error = ""
+
+    label = "" if status == "all" else f"{status} "
+    if error:
+        content = f"To-do list: {error}"
+    elif not tasks:
+        content = f"To-do list: no {label}tasks found."
+    else:
+        first = (page - 1) * page_size + 1
+        content = f"To-do list: {total} {label}tasks, showing {first}-{first + len(tasks) - 1}\n"
+        content += "\n".join(format_task(task) for task in tasks)
+        if first + len(tasks) - 1 < total:
+            content += f"\nMore tasks: call again with page={page + 1}"
     
     tool_message = ToolMessage(content, tool_call_id=tool_call_id)
 
@@ -73,30 +111,10 @@ def update_to_do_list(taskDescription:str, tool_call_id: Annotated[str, Injected
     Output:
         - Confirmation of the task saved.
     """
-    # Read existing tasks
-    with open("services/to_do_list/to_do_list.json") as file:
-        to_do_list = json.load(file)
-
-    # Create a new task
-    newTask = {
-        "taskId": str(uuid.uuid4()),
-        "taskDescription": taskDescription,
-        "Completed": False,
-        "registerDate": datetime.today().strftime("%Y-%m-%d %H:%M"),
-        "dueDate": "never"
-    }
-
-    # Append new task to the list
-    to_do_list.append(newTask) 
-
-    # Write updated list back to file
-    with open("services/to_do_list/to_do_list.json", "w") as file:
-        json.dump(to_do_list, file, indent=4)
+    # Create a new task (one transaction, no rewrite of the list)
+    newTask = get_to_do_store().add_task(taskDescription)
     
-    content = f"""
-    To-do list updated with task:
-    {json.dumps(newTask,indent=2)}
-    """
+    content = f"To-do list updated with task:\n{format_task(newTask)}"
     
     tool_message = ToolMessage(content, tool_call_id=tool_call_id)
 
@@ -1,29 +1,225 @@
-from typing import Any, Dict
+import asyncio
+import time
+from collections import OrderedDict
+from threading import Lock, Thread
+from typing import Any, AsyncIterator, Dict, Tuple
 
+from termcolor import colored
+
+from chat.model_registry import get_model_registry
 from chat.models import ResponseMessage
 from config.settings import Settings
+from log_module.log_writer import get_log_writer
+from log_module.metrics import get_metrics
+from log_module.tracing import SERVER, get_tracer
+from memory.retention import format_report, prune_memory
+from tts.worker_pool import shutdown_tts_pool
 
 from .session import ChatSession
 
 
 class ChatManager:
-    """Manages chat sessions."""
+    """Manages chat sessions.
+
+    Sessions are keyed by a client-supplied session id. Each session keeps its
+    own lock, so independent sessions run in parallel. At most
+    ``Settings.MAX_SESSIONS`` sessions stay resident: the least recently used
+    (or idle for longer than ``Settings.SESSION_IDLE_TTL``) are evicted and
+    rehydrated from the SQLite checkpointer the next time they are used. The
+    thread ids of at most ``Settings.MAX_SESSION_THREADS`` sessions are
+    remembered for that (least recently used first out, and dropped when the
+    memory retention deletes their thread).
+    """
 
     def __init__(self, settings: Settings = Settings()):
         self.settings = settings
-        self._session = ChatSession(settings)
+        self._registry_lock = Lock()
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._in_use: Dict[str, int] = {}
+        # Survives eviction: session id -> (thread id, language), least recently used first
+        self._threads: "OrderedDict[str, tuple]" = OrderedDict()
+
+        ChatSession.delete_previous_data(settings)
+
+        self._models = get_model_registry(settings)
+        # Load the agents and TTS pipelines (and prewarm the TTS cache) before the first request
+        Thread(target=self._models.warmup, daemon=True).start()
+
+    def _get_session(self, session_id: str, language: str) -> ChatSession:
+        """Return the resident session for `session_id`, creating or rehydrating it."""
+        with self._registry_lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return self._use_session(session_id, session)
+            thread_id, thread_language = self._threads.get(session_id, (None, language))
+
+        # Outside the lock: building the session can load the models (or wait for
+        # the warmup) and reads its thread from SQLite, other sessions go on meanwhile
+        session = ChatSession(
+            self.settings, self._models, thread_id=thread_id, language=thread_language, session_id=session_id
+        )
+
+        with self._registry_lock:
+            resident = self._sessions.get(session_id)
+            if resident is not None:  # built by a concurrent request in the meantime
+                return self._use_session(session_id, resident)
+            self._sessions[session_id] = session
+            action = "rehydrated" if thread_id else "created"
+            get_metrics().sessions.inc(event=action)
+            if self.settings.VERBOSE:
+                print(colored(f"🧵 Session {session_id} {action} ({session.thread_id})", "light_blue"))
+            return self._use_session(session_id, session)
 
+    def _use_session(self, session_id: str, session: ChatSession) -> ChatSession:
+        """Mark a request on the resident `session_id` as started. Caller holds the registry lock."""
+        self._sessions.move_to_end(session_id)
+        self._last_used[session_id] = time.time()
+        self._in_use[session_id] = self._in_use.get(session_id, 0) + 1
+        self._evict_sessions()
+        return session
 
-    def process_message(self, message: str, language:str="en", sender: str = "human") -> Dict[str, Any]:
+    def _release_session(self, session_id: str, session: ChatSession):
+        """Mark a request on `session_id` as finished and track its thread (it changes after a reset)."""
+        with self._registry_lock:
+            self._in_use[session_id] -= 1
+            if not self._in_use[session_id]:
+                del self._in_use[session_id]
+            self._remember_thread(session_id, session)
+            self._last_used[session_id] = time.time()
+
+    def _remember_thread(self, session_id: str, session: ChatSession):
+        """Track the thread of `session_id`, forgetting the least recently used ones. Caller holds the registry lock."""
+        self._threads[session_id] = (session.thread_id, session.language)
+        self._threads.move_to_end(session_id)
+        while len(self._threads) > self.settings.MAX_SESSION_THREADS:
+            self._threads.popitem(last=False)
+
+    def _evict_sessions(self):
+        """Drop idle and least recently used sessions. Caller holds the registry lock."""
+        now = time.time()
+        for session_id in list(self._sessions):
+            session = self._sessions[session_id]
+            over_capacity = len(self._sessions) > self.settings.MAX_SESSIONS
+            idle = now - self._last_used[session_id] > self.settings.SESSION_IDLE_TTL
+            # Sessions with work still running in the background stay resident
+            if not (over_capacity or idle) or session_id in self._in_use or session.busy:
+                continue
+            self._remember_thread(session_id, session)
+            del self._sessions[session_id]
+            del self._last_used[session_id]
+            get_metrics().sessions.inc(event="evicted")
+            if self.settings.VERBOSE:
+                print(colored(f"💤 Session {session_id} evicted", "light_blue"))
+
+    @staticmethod
+    def _request_attributes(message: str, language: str, sender: str, session_id: str, mode: str) -> dict:
+        """Span attributes of a chat request (the root span of its trace)."""
+        return {
+            "session.id": session_id,
+            "chat.mode": mode,
+            "chat.sender": sender,
+            "chat.language": language,
+            "chat.input_chars": len(message),
+        }
+
+    def process_message(
+        self, message: str, language: str = "EN", sender: str = "human", session_id: str = "default"
+    ) -> Dict[str, Any]:
         """Process a chat message."""
-        return self._session.chat(message, language, sender)
+        language = language.upper()  # the agents and TTS pipelines are keyed "EN", "ES"
+        attributes = self._request_attributes(message, language, sender, session_id, "sync")
+        with get_tracer().span("chat_request", attributes, kind=SERVER):
+            session = self._get_session(session_id, language)
+            try:
+                return session.chat(message, language, sender)
+            finally:
+                self._release_session(session_id, session)
+
+    async def aprocess_message(
+        self,
+        message: str,
+        language: str = "EN",
+        sender: str = "human",
+        session_id: str = "default",
+        defer_tts: bool = False,
+    ) -> Dict[str, Any]:
+        """Process a chat message on the async path (graph.ainvoke). See `ChatSession.achat` for `defer_tts`."""
+        language = language.upper()
+        attributes = self._request_attributes(message, language, sender, session_id, "deferred" if defer_tts else "async")
+        with get_tracer().span("chat_request", attributes, kind=SERVER):
+            # Creating a session loads models: keep it off the event loop
+            session = await asyncio.to_thread(self._get_session, session_id, language)
+            try:
+                return await session.achat(message, language, sender, defer_tts=defer_tts)
+            finally:
+                self._release_session(session_id, session)
+
+    async def astream_message(
+        self, message: str, language: str = "EN", sender: str = "human", session_id: str = "default"
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Process a chat message, streaming (event, data) pairs as the turn runs."""
+        language = language.upper()
+        attributes = self._request_attributes(message, language, sender, session_id, "stream")
+        with get_tracer().span("chat_request", attributes, kind=SERVER):
+            session = await asyncio.to_thread(self._get_session, session_id, language)
+            try:
+                async for event, data in session.astream_chat(message, language, sender):
+                    yield event, data
+            finally:
+                self._release_session(session_id, session)
+
+    def reset_session(self, session_id: str = "default"):
+        """Reset a session."""
+        with self._registry_lock:
+            session = self._sessions.get(session_id)
+            if session_id in self._in_use or (session is not None and session.busy):
+                return
+            self._sessions.pop(session_id, None)
+            self._last_used.pop(session_id, None)
+            self._threads.pop(session_id, None)
 
-    def reset_session(self):
-        """Reset the current session."""
-        self._session = ChatSession(self.settings)
+    def prune_memory(self) -> dict:
+        """Apply the memory.db retention (MEMORY_KEEP_CHECKPOINTS, MEMORY_THREAD_TTL). Resident threads are kept."""
+        with self._registry_lock:
+            resident = {session.thread_id for session in self._sessions.values()}
+        report = prune_memory(
+            self._models.memory_db_path,
+            keep=self.settings.MEMORY_KEEP_CHECKPOINTS,
+            thread_ttl=self.settings.MEMORY_THREAD_TTL,
+            exclude=resident,
+        )
+        # Their threads are gone: these sessions start over next time
+        deleted = set(report["thread_ids"])
+        with self._registry_lock:
+            for session_id, (thread_id, _) in list(self._threads.items()):
+                if thread_id in deleted:
+                    del self._threads[session_id]
+        if self.settings.VERBOSE:
+            print(colored(f"🧹 memory.db pruned | {format_report(report)}", "light_blue"))
+        return report
 
+    async def run_memory_retention(self):
+        """Prune memory.db every MEMORY_RETENTION_INTERVAL seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(self.settings.MEMORY_RETENTION_INTERVAL)
+            try:
+                await asyncio.to_thread(self.prune_memory)
+            except Exception as e:
+                print(colored(f"Memory retention failed: {e}", "red"))
 
-    
+    async def aclose(self):
+        """Wait for the background work of every session (deferred TTS, compaction), then `close`."""
+        with self._registry_lock:
+            sessions = list(self._sessions.values())
+        await asyncio.gather(*(session.wait_background() for session in sessions))
+        self.close()
 
-    
-            
+    def close(self):
+        """Drop every resident session and release the shared models (called on application shutdown)."""
+        with self._registry_lock:
+            self._sessions.clear()
+            self._last_used.clear()
+        self._models.close()
+        shutdown_tts_pool()
+        get_log_writer().close()
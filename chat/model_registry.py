@@ -0,0 +1,194 @@
+import asyncio
+import sqlite3
+from threading import Lock
+from typing import Dict, Iterable, Optional
+
+import aiosqlite
+from langchain_ollama import ChatOllama
+from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from termcolor import colored
+
+from chat.agent.graph import INTERRUPT_PHRASE, Agent
+from config.settings import Settings
+from frontend.format_response import format_tts_response
+from images import generate_images
+from log_module.log_utils import get_token_counter
+from log_module.metrics import get_metrics
+from log_module.tracing import get_tracer
+from tts.TTS import TTSGenerator
+
+
+class TimedSqliteSaver(SqliteSaver):
+    """SqliteSaver that reports the latency of its writes as the checkpoint_write stage (and span)."""
+
+    def put(self, *args, **kwargs):
+        with get_metrics().stage_seconds.time(stage="checkpoint_write"), get_tracer().span("checkpoint_write"):
+            return super().put(*args, **kwargs)
+
+    def put_writes(self, *args, **kwargs):
+        with get_metrics().stage_seconds.time(stage="checkpoint_write"), get_tracer().span("checkpoint_writes"):
+            return super().put_writes(*args, **kwargs)
+
+
+class TimedAsyncSqliteSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver that reports the latency of its writes as the checkpoint_write stage (and span)."""
+
+    async def aput(self, *args, **kwargs):
+        with get_metrics().stage_seconds.time(stage="checkpoint_write"), get_tracer().span("checkpoint_write"):
+            return await super().aput(*args, **kwargs)
+
+    async def aput_writes(self, *args, **kwargs):
+        with get_metrics().stage_seconds.time(stage="checkpoint_write"), get_tracer().span("checkpoint_writes"):
+            return await super().aput_writes(*args, **kwargs)
+
+
+class ModelRegistry:
+    """
+    Process-wide models shared by every session and kept across resets: the
+    LLM client, one compiled agent graph (with its tool binding) per language,
+    one TTS pipeline per language and the checkpointers of memory.db.
+
+    Sessions only differ in their thread id, so they can all share them.
+    """
+
+    def __init__(self, settings: Settings, memory_db_path: str = "memory/memory.db"):
+        self.settings = settings
+        self._memory_db_path = memory_db_path
+        self._lock = Lock()
+
+        self._llm = None
+        self._agents: Dict[str, Agent] = {}
+        self._tts_generators: Dict[str, TTSGenerator] = {}
+
+        self._memory_conn: sqlite3.Connection = None
+        self._checkpointer: SqliteSaver = None
+        self._amemory_conn: aiosqlite.Connection = None
+        self._async_checkpointer: AsyncSqliteSaver = None
+        self._amemory_ready: asyncio.Task = None  # opens the async connection and sets its pragmas
+
+    @property
+    def memory_db_path(self) -> str:
+        return self._memory_db_path
+
+    def _create_llm(self):
+        """Create LLM instance based on configuration."""
+        if self.settings.MODEL_SERVER == "OPENAI":
+            return ChatOpenAI(
+                model=Settings.MODEL_NAME,
+                temperature=1,
+                api_key=self.settings.OPENAI_API_KEY,
+            )
+        else:
+            return ChatOllama(
+                model=Settings.MODEL_NAME, temperature=0, num_ctx=16000, n_seq_max=1
+            )
+
+    def _memory_pragmas(self) -> list:
+        """
+        WAL journal (readers do not block the writer, a commit appends to the log)
+        and CHECKPOINT_SYNCHRONOUS: with NORMAL, commits are not fsync'd, only
+        WAL checkpoints are. A power loss may drop the last turns, never corrupt the db.
+        """
+        return ["PRAGMA journal_mode=WAL", f"PRAGMA synchronous={self.settings.CHECKPOINT_SYNCHRONOUS}"]
+
+    def _create_memory_checkpointer(self) -> SqliteSaver:
+        """Create memory checkpointer (one connection shared by all the sessions)."""
+        self._memory_conn = sqlite3.connect(database=self._memory_db_path, check_same_thread=False)
+        for pragma in self._memory_pragmas():
+            self._memory_conn.execute(pragma)
+        return TimedSqliteSaver(self._memory_conn)
+
+    async def _open_async_memory(self, conn: aiosqlite.Connection):
+        await conn  # starts the connection thread
+        for pragma in self._memory_pragmas():
+            await conn.execute(pragma)
+
+    def get_agent(self, language: str) -> Agent:
+        """Compiled agent graph for `language`, built on first use."""
+        with self._lock:
+            agent = self._agents.get(language)
+            if agent is None:
+                if self._llm is None:
+                    self._llm = self._create_llm()
+                if self._checkpointer is None:
+                    self._checkpointer = self._create_memory_checkpointer()
+                agent = Agent(llm=self._llm, language=language, checkpointer=self._checkpointer)
+                self._agents[language] = agent
+                generate_images.draw_mermaid(agent.graph)
+            return agent
+
+    def get_tts_generator(self, language: str) -> TTSGenerator:
+        """TTS generator (Kokoro pipeline) for `language`, loaded on first use."""
+        with self._lock:
+            generator = self._tts_generators.get(language)
+            if generator is None:
+                generator = TTSGenerator(tts_language=language)
+                self._tts_generators[language] = generator
+            return generator
+
+    async def get_async_graph(self, language: str):
+        """
+        Agent graph compiled against the async checkpointer. The AsyncSqliteSaver is
+        bound to the running event loop, so it is (re)created when the loop changes.
+        """
+        loop = asyncio.get_running_loop()
+        agent = self.get_agent(language)
+        with self._lock:
+            if self._async_checkpointer is None or self._async_checkpointer.loop is not loop:
+                self._close_async_checkpointer()
+                self._amemory_conn = aiosqlite.connect(self._memory_db_path)
+                self._amemory_ready = loop.create_task(self._open_async_memory(self._amemory_conn))
+                self._async_checkpointer = TimedAsyncSqliteSaver(self._amemory_conn)
+            if agent.agraph is None or agent.agraph.checkpointer is not self._async_checkpointer:
+                agent.compile_async(self._async_checkpointer)
+            graph, ready = agent.agraph, self._amemory_ready
+        await asyncio.shield(ready)
+        return graph
+
+    def warmup(self, languages: Iterable[str] = ("EN", "ES")):
+        """Load every model ahead of the first request and fill the TTS cache."""
+        for language in languages:
+            try:
+                self.get_agent(language)
+                generator = self.get_tts_generator(language)
+                if self.settings.TTS_PREWARM:
+                    phrases = [format_tts_response(INTERRUPT_PHRASE[language])]
+                    generator.prewarm(phrases + self.settings.TTS_PREWARM_PHRASES.get(language, []))
+            except Exception as e:
+                print(colored(f"Warmup failed ({language}): {e}", "red"))
+        get_token_counter().count_text("warmup")  # load the tokenizer
+        if self.settings.VERBOSE:
+            print(colored("🔥 Models loaded", "light_blue"))
+
+    def _close_async_checkpointer(self):
+        if self._amemory_conn is not None:
+            self._amemory_conn.stop()
+            self._amemory_conn = None
+            self._amemory_ready = None
+            self._async_checkpointer = None
+
+    def close(self):
+        with self._lock:
+            self._close_async_checkpointer()
+            if self._memory_conn is not None:
+                self._memory_conn.close()
+                self._memory_conn = None
+                self._checkpointer = None
+            for agent in self._agents.values():
+                agent.close()
+            self._agents.clear()
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = Lock()
+
+
+def get_model_registry(settings: Settings = Settings()) -> ModelRegistry:
+    """Process-wide model registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(settings)
+        return _registry
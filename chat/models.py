@@ -6,6 +6,8 @@ class MessageRequest(BaseModel):
 
     message: str
     language: str = "EN"
+    session_id: str = "default"
+    defer_tts: bool = False  # return the text as soon as it is ready, poll the audio at tts_status_url
 
 
 class ResponseMessage(BaseModel):
@@ -16,4 +18,14 @@ class ResponseMessage(BaseModel):
     system_messages: str
     tools_used: list
     tts_text: str
-    tts_audio: str
+    tts_audio: str = ""  # Deprecated inline base64 WAV, use tts_audio_url
+    tts_audio_url: str = ""  # GET /audio/{id}
+    tts_status_url: str = ""  # GET /tts/{handle}, deferred TTS only
+
+
+class DeferredTTSResponse(BaseModel):
+    """Status of a deferred TTS job."""
+
+    status: str  # pending, ready, timeout or failed
+    tts_text: str = ""
+    tts_audio_url: str = ""
@@ -1,37 +1,53 @@
+import asyncio
 import os
-import sqlite3
 from datetime import datetime
 from pathlib import Path
-from threading import Lock
-from typing import Any, Dict, Tuple
+from contextlib import asynccontextmanager
+from threading import Event, Lock, Thread
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
-from langchain_ollama import ChatOllama
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.types import Command
 from termcolor import colored
 from chat.agent.graph import Agent
 from chat.agent.state import AgentState
+from chat.model_registry import ModelRegistry, get_model_registry
 from config.settings import Settings
 from frontend.format_response import format_display_response, format_tts_response
-from tts.TTS import TTSGenerator
-from images import generate_images
+from tts.TTS import TTSGenerator, TTSStream
+from tts.audio_store import audio_url
+from tts.deferred import FAILED, READY, TIMEOUT, deferred_result, deferred_url, get_deferred_tts
 from log_module.log_utils import (
     TimeLogger,
+    TokenTally,
     log_agent_messages,
     log_agent_state,
     log_token_usage,
 )
+from log_module.log_writer import get_log_writer
+from log_module.metrics import get_metrics
+from log_module.tracing import get_tracer
 
 
 class ChatSession:
     """Manages an individual chat session."""
 
-    def __init__(self, settings: Settings, memory_db_path: str = "memory/memory.db"):
+    def __init__(
+        self,
+        settings: Settings,
+        registry: ModelRegistry = None,
+        thread_id: Optional[str] = None,
+        language: str = "EN",
+        session_id: Optional[str] = None,
+    ):
         self.settings = settings
+        self.session_id = session_id  # ChatManager key, tags the logs
+        # One turn at a time on the thread, whatever the path: `chat` takes the
+        # lock directly, the async paths through `_alocked`
         self._session_lock = Lock()
-        self._memory_db_path = memory_db_path
+        self._async_session_lock = asyncio.Lock()  # queues the async turns on the event loop
+        self._registry = registry or get_model_registry(settings)
+        self.language = language
 
         # Initialize session state
         self._agent: Agent = None
@@ -40,57 +56,79 @@ class ChatSession:
         self._prev_msg_count: int = 0
         self._interrupted: bool = False
         self._new_messages: list = []
-        self._timelog: TimeLogger = None
-        self._tts_generator = TTSGenerator()
-
-        self._initialize_session()
-
-    def _create_llm(self):
-        """Create LLM instance based on configuration."""
-        if self.settings.MODEL_SERVER == "OPENAI":
-            return ChatOpenAI(
-                model=Settings.MODEL_NAME,
-                temperature=1,
-                api_key=self.settings.OPENAI_API_KEY,
-            )
-        else:
-            return ChatOllama(
-                model=Settings.MODEL_NAME, temperature=0, num_ctx=16000, n_seq_max=1
-            )
+        # Step timings, passed to the graph nodes through the config (never checkpointed)
+        self._timelog = TimeLogger(settings.TIMELOG_MAX_STEPS)
+        self._tts_generator: TTSGenerator = None
+        self._history_tokens = TokenTally()
+        # Work left running after a turn (deferred TTS, compaction)
+        self._background: asyncio.Task = None
+        self._background_done = Event()  # set when `_background` finishes (waited by sync turns)
+        self._background_done.set()
+        self._background_thread: Thread = None
+
+        self._create_agent(language)
+        if thread_id is None or not self._restore_session(thread_id):
+            self._initialize_session(language=language)
+
+    @property
+    def thread_id(self) -> str:
+        """LangGraph thread id of the current conversation."""
+        return self._config["configurable"]["thread_id"]
+
+    @property
+    def busy(self) -> bool:
+        """True while work of the last turn is still running in the background."""
+        return (self._background is not None and not self._background.done()) or (
+            self._background_thread is not None and self._background_thread.is_alive()
+        )
+
+    async def _get_async_graph(self):
+        """Graph compiled with the async checkpointer."""
+        return await self._registry.get_async_graph(self.language)
+
+    def _create_agent(self, language: str):
+        """Get the shared agent graph and TTS generator for `language`."""
+        self._agent = self._registry.get_agent(language)
+        self._tts_generator = self._registry.get_tts_generator(language)
+        self.language = language
 
-    def _create_memory_checkpointer(self):
-        """Create memory checkpointer."""
-        conn = sqlite3.connect(database=self._memory_db_path, check_same_thread=False)
-        return SqliteSaver(conn)
+    def _thread_config(self, thread_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": thread_id, "timelog": self._timelog}}
+
+    def _restore_session(self, thread_id: str) -> bool:
+        """Rehydrate an evicted session from its checkpointed thread. Returns False if the thread is unknown."""
+        self._config = self._thread_config(thread_id)
+
+        snapshot = self._agent.graph.get_state(self._config)
+        if not snapshot.values:
+            return False
+
+        self._state = dict(snapshot.values)
+        self._prev_msg_count = len(self._state.get("_messages", []))
+        self._new_messages = []
+        # Only interrupts wait for an answer: a deferred turn that timed out is paused with none
+        self._interrupted = any(task.interrupts for task in snapshot.tasks)
+
+        if self.settings.VERBOSE:
+            print("🟢 SESSION RESTORED")
+        return True
 
     def _initialize_session(self, language:str="EN"):
         """Initialize a new chat session."""
-        self._delete_previous_data()
-
-        llm = self._create_llm()
-        memory = self._create_memory_checkpointer()
-        self._agent = Agent(llm=llm, language=language, checkpointer=memory)
-        self._state = {"_messages": [], "_timelog": []}
-        self._config = {
-            "configurable": {
-                "thread_id": "thread-"
-                + datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-            }
-        }
+        self._create_agent(language)
+        self._state = {"_messages": []}
+        self._config = self._thread_config("thread-" + datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3])
         self._prev_msg_count = 0
         self._new_messages = []
         self._interrupted = False
-        self._timelog = TimeLogger(self._state.get("_timelog", []))
-        self._tts_generator = TTSGenerator(tts_language=language)
-
-        generate_images.draw_mermaid(self._agent.graph)
 
         if self.settings.VERBOSE:
             print("🟢 SESSION STARTED")
 
-    def _delete_previous_data(self):
-        """Clean up previous session data."""
-        if self.settings.VERBOSE:
+    @staticmethod
+    def delete_previous_data(settings: Settings):
+        """Clean up data left by previous runs (graph images, logs, audio files)."""
+        if settings.VERBOSE:
             print("🔄 Restoring session")
 
         target_folder_names = ["images", "logs", "tts"]
@@ -106,7 +144,7 @@ class ChatSession:
                         and not file.name.endswith(".py")
                     ):
                         os.remove(file)
-                        if self.settings.VERBOSE:
+                        if settings.VERBOSE:
                             print(f"🗑️ Deleted: {file}")
 
     def _extract_messages(self, messages: list) -> Tuple[str, str, str]:
@@ -130,87 +168,416 @@ class ChatSession:
         }
 
         if self.settings.LOGGING:
-            log_agent_state(state_to_log)
-            log_agent_messages(self._new_messages)
-            log_token_usage(self._state.get("_token_usage", {}))
-            self._timelog.log()
+            # Queued for the log writer thread, nothing is written here
+            tags = {"session_id": self.session_id, "thread_id": self.thread_id}
+            log_agent_state(state_to_log, **tags)
+            log_agent_messages(self._new_messages, **tags)
+            log_token_usage(self._state.get("_token_usage", {}), **tags)
+            self._timelog.log(**tags)
 
         if self.settings.VERBOSE:
 
             print(
                 colored(
                     f"🔍 Messages count | TOTAL: {len(self._state['_messages'])} | "
-                    f"PREVIOUS: {self._prev_msg_count} | NEW: {len(self._new_messages)}",
+                    f"PREVIOUS: {self._prev_msg_count} | NEW: {len(self._new_messages)} | "
+                    f"HISTORY TOKENS: {self._history_tokens.update(self._state['_messages'])}",
                     "light_magenta",
                 )
             )
+            if self._agent.tool_cache is not None:
+                stats = self._agent.tool_cache.stats()
+                print(
+                    colored(
+                        f"🧰 Tool cache | HIT RATE: {stats['hit_rate']:.0%} | HITS: {stats['hits']} | "
+                        f"MISSES: {stats['misses']} | INVALIDATIONS: {stats['invalidations']}",
+                        "light_magenta",
+                    )
+                )
+            if self.settings.LOGGING:
+                stats = get_log_writer().stats()
+                print(
+                    colored(
+                        f"🗒️ Log writer | QUEUED: {stats['queued']} | WRITTEN: {stats['written']} | "
+                        f"DROPPED: {stats['dropped']} | ROTATIONS: {stats['rotations']}",
+                        "light_magenta",
+                    )
+                )
+            if self._tts_generator.cache is not None:
+                stats = self._tts_generator.cache.stats()
+                print(
+                    colored(
+                        f"🔊 TTS cache | HIT RATE: {stats['hit_rate']:.0%} | MEMORY HITS: {stats['memory_hits']} | "
+                        f"DISK HITS: {stats['disk_hits']} | MISSES: {stats['misses']}",
+                        "light_magenta",
+                    )
+                )
+
+    def _graph_attributes(self) -> dict:
+        """Span attributes of a graph run."""
+        return {"thread.id": self.thread_id, "thread.messages": len(self._state.get("_messages", []))}
+
+    def _graph_input(self, chat_input: str, sender: str):
+        """Build the graph input of a turn: resume an interrupt, inject an alert or append the human message."""
+        if self._interrupted:
+            self._interrupted = False
+            return Command(resume=chat_input)
+
+        if sender == "alert manager":
+            get_metrics().alerts.inc()
+            return Command(
+                update={"_messages": HumanMessage(content=chat_input)},
+                goto="LLM_assistant",
+            )
+
+        self._state["_messages"].append(HumanMessage(content=chat_input))
+        return self._state
+
+    def _process_turn(self, tasks) -> Tuple[str, str, str, str]:
+        """Extract the new messages of the turn, handle interrupts and pick the text to speak."""
+        tts_text = ""
+        get_metrics().turns.inc()
+
+        # Extract new messages
+        self._new_messages = self._state["_messages"][self._prev_msg_count :]
+        self._prev_msg_count = len(self._state["_messages"])
+
+        ai_messages, tool_messages, system_messages = self._extract_messages(
+            self._new_messages
+        )
+
+        # Check for interrupts (tasks paused by interrupt_before carry none)
+        tasks = [task for task in tasks if task.interrupts]
+        if tasks:
+            self._interrupted = True
+            get_metrics().interrupts.inc()
+            interrupt_phrase = tasks[0].interrupts[0].value
+            ai_messages += (
+                f"\n{interrupt_phrase}" if ai_messages else f"{interrupt_phrase}"
+            )
+            tts_text = format_tts_response(interrupt_phrase)
+
+        # Get the text-to-speech output
+        tts_text = format_tts_response(self._state.get("_tts_text", "")) if not tts_text else tts_text
+
+        return ai_messages, tool_messages, system_messages, tts_text
+
+    def _build_response(
+        self,
+        ai_messages: str,
+        tool_messages: str,
+        system_messages: str,
+        tts_text: str,
+        tts_audio_id: str,
+        tts_handle: str = "",
+    ) -> Dict[str, str]:
+        with get_metrics().stage_seconds.time(stage="format"), get_tracer().span("format_response") as span:
+            ai_messages = format_display_response(ai_messages.strip())
+            span.set({"response.ai_chars": len(ai_messages), "response.tts_chars": len(tts_text)})
+        return {
+            "ai_messages": ai_messages,
+            "tool_messages": tool_messages.strip(),
+            "system_messages": system_messages.strip(),
+            "tools_used": self._state.get("_tools_used", []),
+            "tts_text": tts_text,
+            "tts_audio_url": audio_url(tts_audio_id),
+            "tts_status_url": deferred_url(tts_handle),
+        }
 
     def chat(self, chat_input: str, language:str, sender: str = "human") -> Dict[str, str]:
         """Process a chat input and return response."""
         with self._session_lock:
-            ai_messages, tool_messages, system_messages, tts_text, tts_base64 = "", "", "", "", ""
+            self.join_background()
 
             # Handle session reset
             if chat_input.strip().lower() == "exit":
                 self._initialize_session(language=language)
-                self._delete_previous_data()
-                ai_messages = "Session reset."
-            else:
-                # Process normal chat
-                self._timelog = TimeLogger(self._state.get("_timelog", []))
-
-                if self._interrupted:
-                    self._state = self._agent.graph.invoke(
-                        Command(resume=chat_input), self._config
-                    )
-                    self._interrupted = False
-                else:
-                    if sender == "human":
-                        self._state["_messages"].append(HumanMessage(content=chat_input))
-                        self._state = self._agent.graph.invoke(self._state, self._config)
-                    elif sender == "alert manager":
-                        self._state = self._agent.graph.invoke(
-                            Command(
-                                update={"_messages": HumanMessage(content=chat_input)},
-                                goto="LLM_assistant",
-                            ),
-                            self._config,
-                        )
-
-                # Extract new messages
-                self._new_messages = self._state["_messages"][self._prev_msg_count :]
-                self._prev_msg_count = len(self._state["_messages"])
-
-                ai_messages, tool_messages, system_messages = self._extract_messages(
-                    self._new_messages
+                return self._build_response("Session reset.", "", "", "", "")
+
+            # Process normal chat
+            graph = self._agent.graph
+            with get_tracer().span("graph", self._graph_attributes()):
+                self._state = graph.invoke(
+                    self._graph_input(chat_input, sender), self._config, durability=self.settings.CHECKPOINT_DURABILITY
                 )
 
-                # Check for interrupts
-                tasks = self._agent.graph.get_state(self._config).tasks
-                if tasks:
-                    self._interrupted = True
-                    interrupt_phrase = tasks[0].interrupts[0].value
-                    ai_messages += (
-                        f"\n{interrupt_phrase}" if ai_messages else f"{interrupt_phrase}"
-                    )
-                    tts_text = format_tts_response(interrupt_phrase)
-                
-                # Get the text-to-speech output 
-                tts_text = format_tts_response(self._state.get("_tts_text", "")) if not tts_text else tts_text 
-                tts_base64 = self._tts_generator.generate(
-                    text=tts_text,
-                    save=True,
+            ai_messages, tool_messages, system_messages, tts_text = self._process_turn(
+                graph.get_state(self._config).tasks
+            )
+            tts_audio_id = self._tts_generator.generate_audio_id(
+                text=tts_text,
+                save=True,
+            )
+
+            self._log_session_data()
+
+            print(tts_text)
+
+            self._background_thread = Thread(target=self._compact, daemon=True)
+            self._background_thread.start()
+
+            return self._build_response(ai_messages, tool_messages, system_messages, tts_text, tts_audio_id)
+
+    def _start_background(self, coro):
+        """Run the background work of an async turn as a task."""
+        self._background = asyncio.create_task(coro)
+        self._background_done.clear()
+        self._background.add_done_callback(lambda _: self._background_done.set())
+
+    @asynccontextmanager
+    async def _alocked(self):
+        """Hold the session lock of `chat` from the event loop, without blocking it."""
+        async with self._async_session_lock:
+            acquire = asyncio.ensure_future(asyncio.to_thread(self._session_lock.acquire))
+            try:
+                await asyncio.shield(acquire)
+            except asyncio.CancelledError:
+                # The lock is still taken once the thread gets it: give it back
+                acquire.add_done_callback(lambda _: self._session_lock.release())
+                raise
+            try:
+                yield
+            finally:
+                self._session_lock.release()
+
+    def join_background(self):
+        """Let the background work of the previous turn finish: it still writes the thread state.
+
+        Called from a worker thread (sync turns), it also waits for the task of an
+        async turn; never call it on the event loop while that task is running.
+        """
+        self._background_done.wait()
+        if self._background_thread is not None:
+            self._background_thread.join()
+            self._background_thread = None
+
+    async def wait_background(self):
+        """Async version of `join_background`."""
+        if self._background is not None:
+            await asyncio.wait([self._background])
+            self._background = None
+        if self._background_thread is not None:
+            await asyncio.to_thread(self.join_background)
+
+    def _compact(self):
+        """Summarize the older turns into the thread state (after the turn, in a background thread)."""
+        try:
+            if self._interrupted or self._agent.graph.get_state(self._config).next:
+                return  # the turn is not over
+            update = self._agent.compact(self._state)
+            if update:
+                self._agent.graph.update_state(self._config, update)
+                self._state.update(update)
+        except Exception as e:
+            print(colored(f"Compaction Error: {e}", "red"))
+
+    async def _acompact(self, graph):
+        """Async version of `_compact`."""
+        try:
+            if self._interrupted or (await graph.aget_state(self._config)).next:
+                return  # the turn is not over
+            update = await self._agent.acompact(self._state)
+            if update:
+                await graph.aupdate_state(self._config, update)
+                self._state.update(update)
+        except Exception as e:
+            print(colored(f"Compaction Error: {e}", "red"))
+
+    async def _after_turn(self, graph, tts_task: asyncio.Task = None):
+        """Background work of an async turn: finish the deferred TTS, then compact."""
+        if tts_task is not None:
+            await asyncio.wait([tts_task])
+        await self._acompact(graph)
+
+    async def achat(
+        self, chat_input: str, language:str, sender: str = "human", defer_tts: bool = False
+    ) -> Dict[str, str]:
+        """Async version of `chat`: runs the graph with ainvoke and the async checkpointer.
+
+        With `defer_tts` the response is returned as soon as LLM_assistant answers:
+        TTS refinement and synthesis go on in the background and the audio is
+        polled at `tts_status_url` (GET /tts/{handle}).
+        """
+        async with self._alocked():
+            await self.wait_background()
+
+            # Handle session reset
+            if chat_input.strip().lower() == "exit":
+                await asyncio.to_thread(self._initialize_session, language=language)
+                return self._build_response("Session reset.", "", "", "", "")
+
+            # Process normal chat
+            graph = await self._get_async_graph()
+            if defer_tts:
+                return await self._achat_deferred(graph, chat_input, sender)
+
+            with get_tracer().span("graph", self._graph_attributes()):
+                self._state = await graph.ainvoke(
+                    self._graph_input(chat_input, sender), self._config, durability=self.settings.CHECKPOINT_DURABILITY
                 )
-                 
-                self._log_session_data()
-                
-                print(tts_text)
-
-            return {
-                "ai_messages": format_display_response(ai_messages.strip()),
-                "tool_messages": tool_messages.strip(),
-                "system_messages": system_messages.strip(),
-                "tools_used": self._state.get("_tools_used", []),
-                "tts_text": tts_text,
-                "tts_audio": tts_base64,
-            }
+
+            ai_messages, tool_messages, system_messages, tts_text = self._process_turn(
+                (await graph.aget_state(self._config)).tasks
+            )
+            # Kokoro inference is CPU bound: keep it off the event loop
+            tts_audio_id = await asyncio.to_thread(
+                self._tts_generator.generate_audio_id,
+                text=tts_text,
+                save=True,
+            )
+
+            self._log_session_data()
+
+            print(tts_text)
+
+            self._start_background(self._after_turn(graph))
+
+            return self._build_response(ai_messages, tool_messages, system_messages, tts_text, tts_audio_id)
+
+    async def _achat_deferred(self, graph, chat_input: str, sender: str) -> Dict[str, str]:
+        """Run the turn up to final_response_node and leave the TTS to a background job."""
+        with get_tracer().span("graph", self._graph_attributes()):
+            self._state = await graph.ainvoke(
+                self._graph_input(chat_input, sender),
+                self._config,
+                interrupt_before=["final_response_node"],
+                durability=self.settings.CHECKPOINT_DURABILITY,
+            )
+        snapshot = await graph.aget_state(self._config)
+
+        ai_messages, tool_messages, system_messages, tts_text = self._process_turn(snapshot.tasks)
+
+        if snapshot.next != ("final_response_node",):
+            # Waiting for confirmation: the interrupt phrase is spoken right away (prewarmed in the cache)
+            tts_audio_id = await asyncio.to_thread(
+                self._tts_generator.generate_audio_id,
+                text=tts_text,
+                save=True,
+            )
+            self._log_session_data()
+            return self._build_response(ai_messages, tool_messages, system_messages, tts_text, tts_audio_id)
+
+        tts_task = asyncio.create_task(self._finish_deferred_tts(graph))
+        tts_handle = get_deferred_tts().put(tts_task)
+        self._start_background(self._after_turn(graph, tts_task))
+
+        return self._build_response(ai_messages, tool_messages, system_messages, "", "", tts_handle)
+
+    async def _complete_deferred_tts(self, graph) -> Dict[str, str]:
+        """Resume the graph at final_response_node (TTS refinement) and synthesize the result."""
+        with get_tracer().span("graph", self._graph_attributes()):
+            self._state = await graph.ainvoke(None, self._config, durability=self.settings.CHECKPOINT_DURABILITY)
+        tts_text = format_tts_response(self._state.get("_tts_text", ""))
+        tts_audio_id = await asyncio.to_thread(
+            self._tts_generator.generate_audio_id,
+            text=tts_text,
+            save=True,
+        )
+        return deferred_result(READY, tts_text, audio_url(tts_audio_id))
+
+    async def _finish_deferred_tts(self, graph) -> Dict[str, str]:
+        """Background part of a deferred turn. Degrades to a text-only turn on timeout or error."""
+        try:
+            result = await asyncio.wait_for(
+                self._complete_deferred_tts(graph), timeout=self.settings.TTS_DEFERRED_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            print(colored("Deferred TTS timed out, the turn stays text-only", "yellow"))
+            result = deferred_result(TIMEOUT)
+        except Exception as e:
+            print(colored(f"Deferred TTS Error: {e}", "red"))
+            result = deferred_result(FAILED)
+
+        self._log_session_data()
+
+        print(result["tts_text"])
+
+        return result
+
+    async def astream_chat(
+        self, chat_input: str, language: str, sender: str = "human"
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Stream a chat turn as (event, data) pairs.
+
+        Events: "token" (LLM_assistant output as it is generated), "tool_start",
+        "tool_end", "interrupt", "audio" (one ordered chunk per spoken sentence,
+        synthesized while the TTS refinement is still being generated) and, last,
+        "final" with the same payload `achat` returns, without the audio reference.
+        """
+        async with self._alocked():
+            await self.wait_background()
+
+            # Handle session reset
+            if chat_input.strip().lower() == "exit":
+                await asyncio.to_thread(self._initialize_session, language=language)
+                yield "final", self._build_response("Session reset.", "", "", "", "")
+                return
+
+            # Process normal chat
+            graph = await self._get_async_graph()
+            tool_names = {}
+            tts_stream = TTSStream(self._tts_generator, formatter=format_tts_response)
+
+            with get_tracer().span("graph", self._graph_attributes()):
+                async for mode, chunk in graph.astream(
+                    self._graph_input(chat_input, sender),
+                    self._config,
+                    stream_mode=["messages", "updates"],
+                    durability=self.settings.CHECKPOINT_DURABILITY,
+                ):
+                    for audio_chunk in tts_stream.ready():
+                        yield "audio", audio_chunk
+
+                    if mode == "messages":
+                        message, metadata = chunk
+                        node = metadata.get("langgraph_node")
+                        if node == "LLM_assistant" and message.content:
+                            yield "token", {"content": message.content}
+                        elif node == "final_response_node" and message.content:
+                            tts_stream.feed(message.content)
+                        continue
+
+                    for node, update in chunk.items():
+                        if node == "__interrupt__":
+                            for pending in update:
+                                yield "interrupt", {"value": pending.value}
+                            continue
+
+                        for message in (update or {}).get("_messages", []):
+                            if isinstance(message, AIMessage):
+                                for tool_call in message.tool_calls:
+                                    tool_names[tool_call["id"]] = tool_call["name"]
+                                    yield "tool_start", {
+                                        "id": tool_call["id"],
+                                        "name": tool_call["name"],
+                                        "args": tool_call["args"],
+                                    }
+                            elif isinstance(message, ToolMessage):
+                                yield "tool_end", {
+                                    "id": message.tool_call_id,
+                                    "name": tool_names.get(message.tool_call_id, ""),
+                                    "content": message.content,
+                                }
+
+            snapshot = await graph.aget_state(self._config)
+            self._state = snapshot.values
+
+            ai_messages, tool_messages, system_messages, tts_text = self._process_turn(
+                snapshot.tasks
+            )
+
+            # Nothing streamed (interrupt, refinement failed): speak the whole text
+            tts_stream.close()
+            if not tts_stream.sentences:
+                tts_stream.feed(tts_text)
+                tts_stream.close()
+            async for audio_chunk in tts_stream.drain():
+                yield "audio", audio_chunk
+
+            self._log_session_data()
+
+            print(tts_text)
+
+            self._start_background(self._after_turn(graph))
+
+            yield "final", self._build_response(ai_messages, tool_messages, system_messages, tts_text, "")
@@ -10,7 +10,86 @@ class Settings:
     VERBOSE = os.environ.get("VERBOSE")
     VERBOSE_LLM = os.environ.get("VERBOSE_LLM")
     LOGGING = os.environ.get("LOGGING")
+    TIMELOG_MAX_STEPS = int(os.environ.get("TIMELOG_MAX_STEPS", 256))  # step timings kept per session
+    TRACING = bool(int(os.environ.get("TRACING", 0)))  # OTLP/JSON spans of every request in LOG_DIR/traces.jsonl
     MODEL_SERVER = os.environ.get("MODEL_SERVER")
     MODEL_NAME = os.environ.get("MODEL_NAME")
     SOFTWARE_VERSION = os.environ.get("SOFTWARE_VERSION")
+    SERVICE_NAME = os.environ.get("SERVICE_NAME", "ai-assistant")  # service.name of the trace spans
     LETTA_API_KEY = os.environ.get("LETTA_API_KEY")
+
+    # Logs: JSON Lines files written in batches by a background thread, rotated by size (bytes) and age (seconds)
+    LOG_DIR = os.environ.get("LOG_DIR", "log_module")
+    LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))  # records waiting to be written, more are dropped
+    LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", 256))
+    LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", 1.0))
+    LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10_000_000))
+    LOG_MAX_AGE = float(os.environ.get("LOG_MAX_AGE", 86400))
+    LOG_BACKUPS = int(os.environ.get("LOG_BACKUPS", 5))  # rotated files kept per log
+
+    # Sessions
+    MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", 32))
+    SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", 1800))  # seconds
+    MAX_SESSION_THREADS = int(os.environ.get("MAX_SESSION_THREADS", 10000))  # session id -> thread id kept for rehydration
+
+    # Token budget of the conversation history sent to the LLM, system prompt included (0 sends it all)
+    CONTEXT_MAX_TOKENS = int(os.environ.get("CONTEXT_MAX_TOKENS", 12000))
+    # Older turns are summarized in the background once the history passes this many tokens (0 disables it)
+    COMPACTION_THRESHOLD_TOKENS = int(os.environ.get("COMPACTION_THRESHOLD_TOKENS", 4000))
+    COMPACTION_KEEP_TURNS = int(os.environ.get("COMPACTION_KEEP_TURNS", 2))  # latest turns always sent verbatim
+
+    # To-do list (SQLite). The JSON file is imported the first time the database is created
+    TO_DO_LIST_DB = os.environ.get("TO_DO_LIST_DB", "services/to_do_list/to_do_list.db")
+    TO_DO_LIST_JSON = os.environ.get("TO_DO_LIST_JSON", "services/to_do_list/to_do_list.json")
+    TO_DO_LIST_PAGE_SIZE = int(os.environ.get("TO_DO_LIST_PAGE_SIZE", 20))  # tasks per check_to_do_list call
+
+    # Checkpoints (memory.db, WAL journal). "exit" writes one checkpoint per turn (at its end or at an
+    # interrupt), "async" every graph step in the background, "sync" every step before the next one
+    CHECKPOINT_DURABILITY = os.environ.get("CHECKPOINT_DURABILITY", "exit")
+    CHECKPOINT_SYNCHRONOUS = os.environ.get("CHECKPOINT_SYNCHRONOUS", "NORMAL")  # SQLite synchronous pragma
+
+    # Retention of memory.db: checkpoints kept per thread and seconds without activity before a
+    # thread is deleted (0 keeps all), pruned every MEMORY_RETENTION_INTERVAL seconds (0: only by CLI)
+    MEMORY_KEEP_CHECKPOINTS = int(os.environ.get("MEMORY_KEEP_CHECKPOINTS", 5))
+    MEMORY_THREAD_TTL = float(os.environ.get("MEMORY_THREAD_TTL", 30 * 24 * 3600))
+    MEMORY_RETENTION_INTERVAL = float(os.environ.get("MEMORY_RETENTION_INTERVAL", 3600))
+
+    # Tool calls of one LLM message run concurrently, each with a timeout in seconds
+    TOOL_WORKERS = int(os.environ.get("TOOL_WORKERS", 4))
+    TOOL_TIMEOUT = float(os.environ.get("TOOL_TIMEOUT", 30))
+    # Per-tool overrides ("|" separated name=seconds)
+    TOOL_TIMEOUTS = {
+        name.strip(): float(seconds)
+        for name, _, seconds in (t.partition("=") for t in os.environ.get("TOOL_TIMEOUTS", "").split("|") if "=" in t)
+    }
+    # Tool result cache: TTL in seconds per tool ("|" separated name=seconds, tools not listed are not cached)
+    TOOL_CACHE_SIZE = int(os.environ.get("TOOL_CACHE_SIZE", 128))  # entries, 0 disables the cache
+    TOOL_CACHE_TTLS = {
+        name.strip(): float(seconds)
+        for name, _, seconds in (
+            t.partition("=")
+            for t in os.environ.get("TOOL_CACHE_TTLS", "check_system_time=60|check_to_do_list=30").split("|")
+            if "=" in t
+        )
+    }
+
+    # Text-to-speech audio cache
+    TTS_CACHE_SIZE = int(os.environ.get("TTS_CACHE_SIZE", 256))  # in-memory entries, 0 disables the cache
+    TTS_CACHE_DISK_SIZE = int(os.environ.get("TTS_CACHE_DISK_SIZE", 2048))  # on-disk entries
+    TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "tts/cache")
+    # Phrases synthesized at startup ("|" separated), on top of the interrupt phrases
+    TTS_PREWARM = bool(int(os.environ.get("TTS_PREWARM", 1)))
+    TTS_PREWARM_PHRASES = {
+        "EN": [p.strip() for p in os.environ.get("TTS_PREWARM_EN", "").split("|") if p.strip()],
+        "ES": [p.strip() for p in os.environ.get("TTS_PREWARM_ES", "").split("|") if p.strip()],
+    }
+
+    # Text-to-speech worker processes (0 runs Kokoro inline in the API process)
+    TTS_WORKERS = int(os.environ.get("TTS_WORKERS", 0))
+    TTS_BATCH_SIZE = int(os.environ.get("TTS_BATCH_SIZE", 8))  # max utterances sent to a worker at once
+    TTS_AUDIO_STORE_SIZE = int(os.environ.get("TTS_AUDIO_STORE_SIZE", 256))  # clips kept for /audio/{id}
+
+    # Answers up to this many words of plain prose skip the TTS refinement LLM call (0 always refines)
+    TTS_FAST_PATH_MAX_WORDS = int(os.environ.get("TTS_FAST_PATH_MAX_WORDS", 60))
+    # Deferred TTS (/chat with defer_tts): seconds the audio may take before the turn stays text-only
+    TTS_DEFERRED_TIMEOUT = float(os.environ.get("TTS_DEFERRED_TIMEOUT", 30))
@@ -91,6 +91,49 @@ def format_display_response(text: str = "") -> str:
     return html
 
 
+# Markdown / HTML structures that do not read well aloud
+NOT_SPEAKABLE_PATTERNS = [
+    re.compile(r'(?m)^\s*([-*+•]|\d+[.)])\s+'),   # bullet or numbered lists
+    re.compile(r'(?m)^\s*#{1,6}\s'),              # headings
+    re.compile(r'\|'),                            # tables
+    re.compile(r'`'),                             # code
+    re.compile(r'\*\*|__|~~'),                     # bold, strikethrough
+    re.compile(r'\[[^\]]*\]\([^)]*\)'),           # links
+    re.compile(r'https?://|www\.'),                # urls
+    re.compile(r'<(?!think>|/think>)[a-zA-Z/][^>]*>'),  # html tags
+    re.compile(r'\$[^$]+\$|\\\(|\\\['),           # math
+]
+EMOJI_PATTERN = re.compile(r'[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F]|&#x[0-9A-Fa-f]+;')
+NUMBER_PATTERN = re.compile(r'\d+(?:[.,:/-]\d+)*')
+
+
+def is_speakable(text: str = "", max_words: int = 60, max_lines: int = 3, max_numbers: int = 3) -> bool:
+    """
+    Deterministic speakability check: True when `text` is already short, plain
+    prose (no markdown, tables, lists, code or dense numbers) that can be spoken
+    after `format_tts_response` cleanup, without an LLM refinement call.
+    """
+    text = re.sub(r"<think>(.*?)</think>", r'', text, flags=re.DOTALL).strip()
+    if not text:
+        return False
+    if len(text.split()) > max_words:
+        return False
+    if len([line for line in text.splitlines() if line.strip()]) > max_lines:
+        return False
+    if any(pattern.search(text) for pattern in NOT_SPEAKABLE_PATTERNS):
+        return False
+    if len(NUMBER_PATTERN.findall(text)) > max_numbers:
+        return False
+    return True
+
+
+def format_speakable_response(text: str = "") -> str:
+    """Local TTS text for a message that passed `is_speakable`: no emojis, no markdown leftovers, one paragraph."""
+    text = format_tts_response(text)
+    text = EMOJI_PATTERN.sub('', text)
+    return " ".join(text.split())
+
+
 def format_tts_response(text: str = "") -> str:
 
     
@@ -0,0 +1,223 @@
+import glob
+import json
+import os
+
+import pandas as pd
+
+
+class JsonlTail:
+    """
+    Incremental reader of a JSON Lines log: each `read` parses only the lines
+    appended since the previous call, starting from the remembered byte offset.
+
+    The file is opened only while reading, so the writer can rotate it. When it
+    has been rotated (new inode, or smaller than the offset), the rest of the
+    rotated file (`<stream>_<date>.jsonl` with the old inode) is read first and
+    the new file is read from the start. A line still being written (no
+    trailing newline) is left for the next call. At most `max_bytes` are read
+    per call, so a large backlog is loaded over several refreshes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 16_000_000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.offset = 0
+        self._inode = None
+
+    def read(self) -> list[dict]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+
+        records = []
+        if self._inode is not None and (stat.st_ino != self._inode or stat.st_size < self.offset):
+            rotated = self._rotated_path()
+            if rotated is not None:
+                records += self._read_from(rotated, None)
+            self.offset = 0
+        self._inode = stat.st_ino
+
+        return records + self._read_from(self.path, self.max_bytes)
+
+    def _rotated_path(self):
+        stem, ext = os.path.splitext(self.path)
+        for path in sorted(glob.glob(f"{glob.escape(stem)}_*{ext}"), reverse=True):
+            if os.stat(path).st_ino == self._inode:
+                return path
+        return None
+
+    def _read_from(self, path: str, max_bytes) -> list[dict]:
+        with open(path, "rb") as file:
+            file.seek(self.offset)
+            data = file.read(max_bytes if max_bytes else -1)
+
+        end = data.rfind(b"\n") + 1  # only complete lines
+        self.offset += end
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # blank or corrupted line
+        return records
+
+
+class Downsampled:
+    """
+    Plot data of a growing series in bounded memory: the latest `recent` rows
+    are kept as they are, older rows are merged into bins of `bin_size`
+    consecutive rows (aggregated with `agg`, a column -> pandas function map).
+    When there are more than `max_bins` bins, neighbouring bins are merged in
+    pairs and the bin size doubles, so the history keeps its whole time span.
+    """
+
+    def __init__(self, agg: dict, recent: int = 2000, max_bins: int = 1000):
+        self.agg = agg
+        self.recent = recent
+        self.max_bins = max_bins
+        self.bin_size = 1
+        self._recent = pd.DataFrame()
+        self._history = pd.DataFrame()
+
+    def append(self, rows: pd.DataFrame):
+        self._recent = pd.concat([self._recent, rows], ignore_index=True) if len(self._recent) else rows.reset_index(drop=True)
+
+        # Move whole bins from the recent rows to the history
+        overflow = (len(self._recent) - self.recent) // self.bin_size * self.bin_size
+        if overflow > 0:
+            old, self._recent = self._recent.iloc[:overflow], self._recent.iloc[overflow:].reset_index(drop=True)
+            bins = old.groupby(pd.RangeIndex(len(old)) // self.bin_size).agg(self.agg)
+            self._history = pd.concat([self._history, bins], ignore_index=True) if len(self._history) else bins
+
+        while len(self._history) > self.max_bins:
+            self._history = self._history.groupby(pd.RangeIndex(len(self._history)) // 2).agg(self.agg)
+            self.bin_size *= 2
+
+    def frame(self) -> pd.DataFrame:
+        if not len(self._recent):
+            return self._recent
+        return pd.concat([self._history, self._recent[list(self.agg)]], ignore_index=True)
+
+    def tail(self, rows: int) -> pd.DataFrame:
+        """Last `rows` rows, not downsampled (up to `recent`)."""
+        return self._recent.tail(rows)
+
+
+class TokenUsageMonitor:
+    """
+    Token usage of the agent (token_usage_log.jsonl), updated incrementally:
+    running totals, per-session totals and downsampled plot series. Each
+    `update` costs only the new rows.
+    """
+
+    COLUMNS = ["input_tokens", "output_tokens", "total_tokens", "saved_tokens", "cached_tokens"]
+
+    def __init__(self, path: str = "log_module/token_usage_log.jsonl", recent: int = 2000, max_bins: int = 1000):
+        self.tail = JsonlTail(path)
+        self.series = Downsampled(
+            {
+                "step": "last",
+                "timestamp": "last",
+                "input_tokens": "mean",
+                "output_tokens": "mean",
+                "cumulative_tokens": "last",
+                "prefix_cache_hit_rate": "mean",
+            },
+            recent,
+            max_bins,
+        )
+        self.rows = 0
+        self.totals = dict.fromkeys(self.COLUMNS, 0)
+        self.latest: dict = {}
+        self.sessions = pd.DataFrame(columns=["calls", *self.COLUMNS, "last_seen"])
+
+    def update(self) -> int:
+        """Load the new rows. Returns how many there were."""
+        records = self.tail.read()
+        if not records:
+            return 0
+
+        df = pd.DataFrame.from_records(records)
+        for column in self.COLUMNS:
+            df[column] = df[column].fillna(0) if column in df else 0
+        if "session_id" not in df:
+            df["session_id"] = ""
+        df["session_id"] = df["session_id"].fillna("")
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df["step"] = range(self.rows, self.rows + len(df))
+        df["cumulative_tokens"] = df["total_tokens"].cumsum() + self.totals["total_tokens"]
+        df["prefix_cache_hit_rate"] = (df["cached_tokens"] / df["input_tokens"].where(df["input_tokens"] > 0)).fillna(0)
+
+        sessions = df.groupby("session_id").agg(
+            calls=("total_tokens", "size"), **{column: (column, "sum") for column in self.COLUMNS},
+            last_seen=("timestamp", "max"),
+        )
+        last_seen = pd.concat([self.sessions["last_seen"], sessions["last_seen"]]).groupby(level=0).max()
+        counts = ["calls", *self.COLUMNS]
+        self.sessions = self.sessions[counts].astype(float).add(sessions[counts], fill_value=0).astype(int)
+        self.sessions["last_seen"] = last_seen
+
+        for column in self.COLUMNS:
+            self.totals[column] += int(df[column].sum())
+        self.latest = df.iloc[-1].to_dict()
+        self.rows += len(df)
+        self.series.append(df)
+        return len(df)
+
+
+class TimeLogMonitor:
+    """
+    Step timings of the agent (time_log.jsonl), updated incrementally:
+    per-stage (step label) and per-session/stage aggregates and a downsampled
+    series of step durations.
+    """
+
+    STATS = ["count", "total", "max"]
+
+    def __init__(self, path: str = "log_module/time_log.jsonl", recent: int = 2000, max_bins: int = 1000):
+        self.tail = JsonlTail(path)
+        self.series = Downsampled({"step": "last", "timestamp": "last", "delta": "mean"}, recent, max_bins)
+        self.rows = 0
+        self._stages = pd.DataFrame(columns=self.STATS)
+        self._session_stages = pd.DataFrame(columns=self.STATS)
+
+    def update(self) -> int:
+        """Load the new rows. Returns how many there were."""
+        records = self.tail.read()
+        if not records:
+            return 0
+
+        df = pd.DataFrame.from_records(records)
+        df["session_id"] = df["session_id"].fillna("") if "session_id" in df else ""
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df["step"] = range(self.rows, self.rows + len(df))
+
+        self._stages = self._merge(self._stages, df.groupby("label")["delta"])
+        self._session_stages = self._merge(self._session_stages, df.groupby(["session_id", "label"])["delta"])
+        self.rows += len(df)
+        self.series.append(df[["step", "timestamp", "label", "session_id", "delta"]])
+        return len(df)
+
+    def _merge(self, stats: pd.DataFrame, groups) -> pd.DataFrame:
+        new = groups.agg(["count", "sum", "max"]).rename(columns={"sum": "total"})
+        if not len(stats):
+            return new
+        merged = stats[["count", "total"]].add(new[["count", "total"]], fill_value=0)
+        merged["max"] = pd.concat([stats["max"], new["max"]]).groupby(level=list(range(new.index.nlevels))).max()
+        return merged
+
+    @staticmethod
+    def _with_mean(stats: pd.DataFrame) -> pd.DataFrame:
+        stats = stats.copy()
+        stats["count"] = stats["count"].astype(int)
+        stats["mean"] = stats["total"] / stats["count"]
+        return stats[["count", "mean", "max", "total"]]
+
+    def stages(self) -> pd.DataFrame:
+        """count / mean / max / total seconds per step label."""
+        return self._with_mean(self._stages).sort_values("total", ascending=False)
+
+    def session_stages(self) -> pd.DataFrame:
+        """count / mean / max / total seconds per (session, step label)."""
+        return self._with_mean(self._session_stages)
@@ -1,75 +1,217 @@
-import csv
+import hashlib
 import json
-import os
+from collections import OrderedDict, deque
 from datetime import datetime
-from langchain_core.messages import message_to_dict, BaseMessage
+from threading import Lock
+from langchain_core.messages import BaseMessage
 import tiktoken
 import time
 import logging
 from termcolor import colored
 
-def log_token_usage(token_usage: dict, timestamp: str = None):
-    if timestamp is None:
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-    file_path = "log_module/token_usage_log.csv"
-    file_exists = os.path.exists(file_path)
-
-    with open(file_path, mode='a', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        if not file_exists:
-            writer.writerow(["timestamp", "input_tokens", "output_tokens", "total_tokens"])
-        total = token_usage.get("input_tokens", 0) + token_usage.get("output_tokens", 0)
-        writer.writerow([timestamp, token_usage.get("input_tokens", 0), token_usage.get("output_tokens", 0), total])
-        
-def log_agent_messages(new_messages: list):
-    file_path = "log_module/agent_messages_log.txt"
-
-    with open(file_path, "a", encoding="utf-8") as log_file:
-        for message in new_messages:
-            agent_message_entry = json.dumps(message_to_dict(message))
-            log_file.write("\n" + "=" * 50 + "\n")
-            log_file.write(f"🕒 Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            log_file.write("=" * 50 + "\n")
-            log_file.write(agent_message_entry + "\n")
-            
-            
-def log_agent_state(state: dict):
-    file_path = "log_module/agent_state_log.txt"
-    try:
-        with open(file_path, "a", encoding="utf-8") as log_file:
-            log_file.write("\n" + "=" * 50 + "\n")
-            log_file.write(f"🕒 Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            log_file.write("=" * 50 + "\n")
-            log_file.write(json.dumps(state, indent=2) + "\n")
-    except Exception as e:
-        #print(f"State could not be logged: {e}")
-        pass
-        
-
-def count_tokens(messages: list[BaseMessage], model_name: str = "gpt-4o") -> int:
+from config.settings import Settings
+from log_module.log_writer import get_log_writer
+from log_module.metrics import get_metrics
+
+# Logs are JSON Lines records written by a background thread (see log_writer.py),
+# tagged with the session and thread ids passed as `tags`.
+
+def _now() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def log_token_usage(token_usage: dict, timestamp: str = None, **tags):
+    input_tokens, output_tokens = token_usage.get("input_tokens", 0), token_usage.get("output_tokens", 0)
+    get_log_writer().write("token_usage_log", {
+        "timestamp": timestamp or _now(),
+        **tags,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "saved_tokens": token_usage.get("saved_tokens", 0),
+        "cached_tokens": token_usage.get("cached_tokens", 0),
+    })
+
+
+def log_agent_messages(new_messages: list, **tags):
+    writer = get_log_writer()
+    timestamp = _now()
+    for message in new_messages:
+        # Serialized by the writer thread (message_to_dict)
+        writer.write("agent_messages_log", {"timestamp": timestamp, **tags, "message": message})
+
+
+def log_agent_state(state: dict, **tags):
+    get_log_writer().write("agent_state_log", {"timestamp": _now(), **tags, "state": dict(state)})
+
+
+# Ollama model (name prefix) -> Hugging Face tokenizer, used when the `tokenizers` package is installed
+OLLAMA_TOKENIZERS = {
+    "qwen3": "Qwen/Qwen3-8B",
+    "qwen2.5": "Qwen/Qwen2.5-7B-Instruct",
+    "llama3": "NousResearch/Meta-Llama-3-8B-Instruct",
+    "mistral": "mistralai/Mistral-7B-Instruct-v0.3",
+}
+
+
+class TokenCounter:
+    """
+    Token accounting for one model. The encoder is loaded once, and the count
+    of every message is memoized by (type, id, content, tool calls), so counting
+    a growing history only encodes the new messages.
+
+    Tokenizer: tiktoken for OpenAI models, the model's own Hugging Face tokenizer
+    for Ollama models (see OLLAMA_TOKENIZERS), cl100k_base otherwise, and a
+    4-characters-per-token estimate if no encoding can be loaded (offline).
+    """
+
+    TOKENS_PER_MESSAGE = 3  # base count per message for GPT-4o-like models
+    TOKENS_PER_NAME = 1     # if 'name' is present in AIMessage, etc.
+    REPLY_PRIMING = 3       # every reply is primed with <|start|>assistant
+
+    def __init__(self, model_name: str = "gpt-4o", model_server: str = "OPENAI", max_cached: int = 8192):
+        self.model_name = model_name or "gpt-4o"
+        self.model_server = model_server
+        self.max_cached = max_cached
+        self.tokenizer = None  # name of the loaded tokenizer
+        self._encode = None
+        self._counts: "OrderedDict[tuple, int]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_encoder(self):
+        """Pick the tokenizer of the model. Returns a function text -> number of tokens."""
+        if self.model_server != "OPENAI":
+            repo = next((repo for prefix, repo in OLLAMA_TOKENIZERS.items() if self.model_name.startswith(prefix)), None)
+            if repo is not None:
+                try:
+                    from tokenizers import Tokenizer
+
+                    tokenizer = Tokenizer.from_pretrained(repo)
+                    self.tokenizer = repo
+                    return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+                except Exception:
+                    pass  # not installed or not reachable: use tiktoken
+
         try:
-            encoding = tiktoken.encoding_for_model(model_name)
-        except KeyError:
-            # fallback for unknown models
-            encoding = tiktoken.get_encoding("cl100k_base")
-
-        tokens_per_message = 3  # base count per message for GPT-4o-like models
-        tokens_per_name = 1     # if 'name' is present in AIMessage, etc.
-        total_tokens = 0
-
-        for message in messages:
-            total_tokens += tokens_per_message
-            for key, value in message_to_dict(message)["data"].items():
-                if key == "name":
-                    total_tokens += tokens_per_name
-                elif isinstance(value, str):
-                    total_tokens += len(encoding.encode(value))
-
-        total_tokens += 3  # every reply is primed with <|start|>assistant
-        return total_tokens
-    
-    
+            try:
+                encoding = tiktoken.encoding_for_model(self.model_name)
+            except KeyError:
+                # fallback for unknown models
+                encoding = tiktoken.get_encoding("cl100k_base")
+            self.tokenizer = encoding.name
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            print(colored(f"Token counter: no encoding available ({e}), estimating tokens", "yellow"))
+            self.tokenizer = "estimate"
+            return lambda text: (len(text) + 3) // 4
+
+    def count_text(self, text: str) -> int:
+        if self._encode is None:
+            with self._lock:
+                if self._encode is None:
+                    self._encode = self._load_encoder()
+        return self._encode(text) if text else 0
+
+    @staticmethod
+    def _text(message: BaseMessage) -> tuple:
+        """(content, tool calls) of a message, as the text that is counted."""
+        tool_calls = getattr(message, "tool_calls", None)
+        return (
+            message.content if isinstance(message.content, str) else json.dumps(message.content, default=str),
+            json.dumps(tool_calls, sort_keys=True, default=str) if tool_calls else "",
+        )
+
+    @staticmethod
+    def _key(message: BaseMessage, content: str, tool_calls: str) -> tuple:
+        """Memo key: the message id and a hash of what is counted (the memo never holds message texts)."""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (message.type, message.name or "", content, tool_calls):
+            digest.update(part.encode("utf-8", "surrogatepass") + b"\x1f")
+        return message.id, digest.digest()
+
+    def count_message(self, message: BaseMessage) -> int:
+        """Tokens of one message (memoized)."""
+        content, tool_calls = self._text(message)
+        key = self._key(message, content, tool_calls)
+        with self._lock:
+            tokens = self._counts.get(key)
+            if tokens is not None:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return tokens
+
+        name = message.name
+        tokens = self.TOKENS_PER_MESSAGE + self.count_text(content) + self.count_text(tool_calls)
+        if name:
+            tokens += self.TOKENS_PER_NAME
+
+        with self._lock:
+            self.misses += 1
+            self._counts[key] = tokens
+            while len(self._counts) > self.max_cached:
+                self._counts.popitem(last=False)
+        return tokens
+
+    def count(self, messages: list[BaseMessage]) -> int:
+        """Tokens of a prompt made of `messages`."""
+        return sum(self.count_message(message) for message in messages) + self.REPLY_PRIMING
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "tokenizer": self.tokenizer,
+                "cached": len(self._counts),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class TokenTally:
+    """Running token total of an append-only message list (e.g. a conversation history)."""
+
+    def __init__(self, counter: TokenCounter = None):
+        self.counter = counter or get_token_counter()
+        self.total = TokenCounter.REPLY_PRIMING
+        self._counted = 0
+        self._last_id = None
+
+    def update(self, messages: list[BaseMessage]) -> int:
+        """Add the messages appended since the last update and return the total."""
+        # The list was replaced (new session, restored thread): count it again
+        if len(messages) < self._counted or (
+            self._counted and messages[self._counted - 1].id != self._last_id
+        ):
+            self.total, self._counted = TokenCounter.REPLY_PRIMING, 0
+
+        for message in messages[self._counted:]:
+            self.total += self.counter.count_message(message)
+        self._counted = len(messages)
+        self._last_id = messages[-1].id if messages else None
+        return self.total
+
+
+_token_counters: dict = {}
+_token_counters_lock = Lock()
+
+
+def get_token_counter(model_name: str = None) -> TokenCounter:
+    """Process-wide token counter for `model_name` (the configured MODEL_NAME by default)."""
+    model_name = model_name or Settings.MODEL_NAME or "gpt-4o"
+    with _token_counters_lock:
+        counter = _token_counters.get(model_name)
+        if counter is None:
+            counter = TokenCounter(model_name, Settings.MODEL_SERVER)
+            _token_counters[model_name] = counter
+        return counter
+
+
+def count_tokens(messages: list[BaseMessage], model_name: str = None) -> int:
+    return get_token_counter(model_name).count(messages)
+
 
 """logging.basicConfig(
     format='[%(asctime)s] %(levelname)s: %(message)s',
@@ -78,55 +220,72 @@ def count_tokens(messages: list[BaseMessage], model_name: str = "gpt-4o") -> int
 )"""
 
 class TimeLogger:
-    def __init__(self, log_steps: list):
-        self.steps = log_steps
-        self._last_time = self.steps[-1]["_raw_time"] if self.steps else None
-        self._last_logged_index = len(self.steps)
-        
-    def mark(self, label):
-        now = time.time()
-        wall_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    """
+    Step timings of a session, with a bounded history: a ring buffer of the
+    last `max_steps` steps. It lives outside the graph state (nodes get it
+    through config["configurable"]["timelog"]), so checkpoints do not grow
+    with the length of the session.
+
+    "<stage> Start" / "<stage> End" marks of the STAGE_MARKS stages and the
+    "Tool: <name>" records also feed the latency histograms of /metrics.
+    """
+
+    STAGE_MARKS = {"LLM": "llm_node", "Tools": "tool_node", "Final Response": "final_response_node"}
 
-        if self._last_time is None:
-            delta = 0.0
-        else:
-            delta = now - self._last_time
+    def __init__(self, max_steps: int = 256):
+        self.steps: deque = deque(maxlen=max_steps)
+        self._last_time = None
+        self._added = 0   # steps added so far
+        self._logged = 0  # steps written by `log`
+        self._started: dict = {}  # stage -> time of its Start mark
+        self._lock = Lock()
 
-        self._last_time = now
+    def _add(self, label, delta, now):
         self.steps.append({
             "label": label,
-            "timestamp": wall_time,
+            "timestamp": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
             "delta": delta,
-            "_raw_time": now  # ✅ Needed for future delta calculations
+            "_raw_time": now,
         })
+        self._added += 1
+
+    def mark(self, label):
+        with self._lock:
+            now = time.time()
+            delta = 0.0 if self._last_time is None else now - self._last_time
+            self._last_time = now
+            self._add(label, delta, now)
+            stage, _, edge = label.rpartition(" ")
+            if stage in self.STAGE_MARKS:
+                if edge == "Start":
+                    self._started[stage] = now
+                elif edge == "End" and stage in self._started:
+                    get_metrics().stage_seconds.observe(now - self._started.pop(stage), stage=self.STAGE_MARKS[stage])
 
         #logging.info(f"{label} (+{delta:.3f}s)")
 
+    def record(self, label, duration):
+        """Add a step measured elsewhere (e.g. one of several concurrent tool calls) without moving the mark."""
+        with self._lock:
+            self._add(label, duration, time.time())
+        if label.startswith("Tool: "):
+            get_metrics().tool_seconds.observe(duration, tool=label[len("Tool: "):])
+
     def report(self):
         print(colored("\n📋 Step Timing Summary:", "light_magenta"))
-        for i, step in enumerate(self.steps):
+        for i, step in enumerate(list(self.steps)):
             print(colored(f"[{step['timestamp']}] {i} {step['label']:<30} (+{step['delta']:.3f}s)", "light_magenta"))
-            
-    def log(self):
-        file_path = "log_module/time_log.csv"
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        file_exists = os.path.exists(file_path)
-        with open(file_path, mode='a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            if not file_exists:
-                writer.writerow(["label", "timestamp", "delta", "_raw_time"])
-
-            for step in self.steps[self._last_logged_index:]:
-                writer.writerow([
-                    step["label"],
-                    step["timestamp"],
-                    step["delta"],
-                    step["_raw_time"]
-                ])
-
-        # Update tracker
-        self._last_logged_index = len(self.steps)
+
+    def log(self, **tags):
+        """Queue the steps added since the last call (the ones still in the buffer) for the time log."""
+        with self._lock:
+            pending = min(self._added - self._logged, len(self.steps))
+            steps = list(self.steps)[len(self.steps) - pending:]
+            self._logged = self._added
+
+        writer = get_log_writer()
+        for step in steps:
+            writer.write("time_log", {**tags, **step})
 
     def total_time(self):
-        return sum(step["delta"] for step in self.steps)
\ No newline at end of file
+        return sum(step["delta"] for step in list(self.steps))
\ No newline at end of file
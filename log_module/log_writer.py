@@ -0,0 +1,196 @@
+import atexit
+import json
+import os
+import queue
+import time
+from datetime import datetime
+from threading import Lock, Thread
+from typing import Optional
+
+from langchain_core.messages import BaseMessage, message_to_dict
+from termcolor import colored
+
+from config.settings import Settings
+
+_STOP = object()
+
+
+def encode(value):
+    """JSON fallback: messages as LangChain dicts, anything else as text."""
+    if isinstance(value, BaseMessage):
+        return message_to_dict(value)
+    return str(value)
+
+
+class LogWriter:
+    """
+    Background writer of the agent logs, one JSON Lines file per stream
+    (`<stream>.jsonl` in `log_dir`).
+
+    `write` only puts the record in a bounded queue and never blocks: when the
+    queue is full the record is dropped and counted. A daemon thread takes the
+    records in batches (up to `batch_size`, or what arrived within
+    `flush_interval` seconds), serializes them and appends each batch with one
+    write per file. A file is rotated to `<stream>_<YYYYmmdd_HHMMSS>.jsonl` once
+    it passes `max_bytes` or is older than `max_age` seconds (counted from when
+    this process opened it); only the newest `backups` rotated files are kept.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = "log_module",
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        max_bytes: int = 10_000_000,
+        max_age: float = 86400,
+        backups: int = 5,
+    ):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._opened: dict = {}  # stream -> time its current file was opened
+        self._lock = Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+
+        os.makedirs(log_dir, exist_ok=True)
+        self._thread = Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def closed(self) -> bool:
+        return not self._thread.is_alive()
+
+    def write(self, stream: str, record: dict) -> bool:
+        """Queue a record for `stream`. Returns False if it was dropped (queue full or writer closed)."""
+        if self.closed:
+            return self._drop()
+        try:
+            self._queue.put_nowait((stream, record))
+            return True
+        except queue.Full:
+            return self._drop()
+
+    def _drop(self) -> bool:
+        with self._lock:
+            self.dropped += 1
+        return False
+
+    def path(self, stream: str) -> str:
+        return os.path.join(self.log_dir, f"{stream}.jsonl")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, stop = [], item is _STOP
+            if not stop:
+                batch.append(item)
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                print(colored(f"Log writer error: {e}", "red"))
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: list):
+        lines: dict = {}
+        for stream, record in batch:
+            lines.setdefault(stream, []).append(json.dumps(record, default=encode, ensure_ascii=False))
+
+        for stream, stream_lines in lines.items():
+            path = self.path(stream)
+            self._rotate(stream, path)
+            with open(path, "a", encoding="utf-8") as file:
+                file.write("\n".join(stream_lines) + "\n")
+
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def _rotate(self, stream: str, path: str):
+        opened = self._opened.setdefault(stream, time.time())
+        if not os.path.exists(path):
+            return
+        too_big = self.max_bytes and os.path.getsize(path) >= self.max_bytes
+        too_old = self.max_age and time.time() - opened >= self.max_age
+        if not (too_big or too_old):
+            return
+
+        os.replace(path, os.path.join(self.log_dir, f"{stream}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"))
+        self._opened[stream] = time.time()
+        with self._lock:
+            self.rotations += 1
+
+        rotated = sorted(
+            name for name in os.listdir(self.log_dir)
+            if name.startswith(f"{stream}_") and name.endswith(".jsonl")
+        )
+        for name in rotated[:max(len(rotated) - self.backups, 0)]:
+            os.remove(os.path.join(self.log_dir, name))
+
+    def flush(self):
+        """Wait until every queued record is written."""
+        if not self.closed:
+            self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread."""
+        if self.closed:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "rotations": self.rotations,
+            }
+
+
+_writer: Optional[LogWriter] = None
+_writer_lock = Lock()
+
+
+def get_log_writer() -> LogWriter:
+    """Process-wide log writer (a new one after `close`)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.closed:
+            _writer = LogWriter(
+                log_dir=Settings.LOG_DIR,
+                max_queue=Settings.LOG_QUEUE_SIZE,
+                batch_size=Settings.LOG_BATCH_SIZE,
+                flush_interval=Settings.LOG_FLUSH_INTERVAL,
+                max_bytes=Settings.LOG_MAX_BYTES,
+                max_age=Settings.LOG_MAX_AGE,
+                backups=Settings.LOG_BACKUPS,
+            )
+        return _writer
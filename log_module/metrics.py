@@ -0,0 +1,149 @@
+import bisect
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels_text(names: tuple, values: tuple) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return ",".join(pairs)
+
+
+def _series(name: str, labels: str) -> str:
+    return f"{name}{{{labels}}}" if labels else name
+
+
+class Counter:
+    """Monotonic counter, one series per combination of label values."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{_series(self.name, _labels_text(self.labels, key))} {value:g}" for key, value in values]
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets (seconds), one series per combination of label values."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = []
+        for key, values in series:
+            labels = _labels_text(self.labels, key)
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            lines.append(f"{_series(self.name + '_sum', labels)} {values[-2]:g}")
+            lines.append(f"{_series(self.name + '_count', labels)} {values[-1]}")
+        return lines
+
+
+class Metrics:
+    """
+    In-process metrics of the assistant, rendered in the Prometheus text
+    format by the /metrics endpoint.
+
+    Stage latencies come from the TimeLogger marks (LLM / tools / final
+    response) and from timers around TTS synthesis, formatting and checkpoint
+    writes.
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "assistant_stage_duration_seconds",
+            "Latency of a pipeline stage: llm_node, tool_node, final_response_node, tts_synthesis, "
+            "format, checkpoint_write.",
+            labels=("stage",),
+        )
+        self.tool_seconds = Histogram(
+            "assistant_tool_duration_seconds", "Latency of each tool call.", labels=("tool",)
+        )
+        self.tokens = Counter("assistant_llm_tokens_total", "Tokens of the agent LLM calls.", labels=("direction",))
+        self.sessions = Counter(
+            "assistant_sessions_total", "Session events: created, rehydrated, evicted.", labels=("event",)
+        )
+        self.turns = Counter("assistant_turns_total", "Chat turns processed.")
+        self.interrupts = Counter("assistant_interrupts_total", "Turns stopped at a confirmation interrupt.")
+        self.alerts = Counter("assistant_alerts_total", "Messages injected by the alert manager.")
+        self.tts_texts = Counter(
+            "assistant_tts_texts_total",
+            "Spoken texts of the final response: skipped (TTS fast path, no LLM call) or refined by the LLM.",
+            labels=("path",),
+        )
+        self._metrics = [
+            self.stage_seconds, self.tool_seconds, self.tokens, self.sessions, self.turns, self.interrupts, self.alerts,
+            self.tts_texts,
+        ]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = Lock()
+
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
@@ -0,0 +1,147 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+
+from config.settings import Settings
+from log_module.log_writer import get_log_writer
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+# OTLP status codes
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}  # int64 as a JSON string, as in the OTLP JSON mapping
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class Span:
+    """One timed operation of a trace. Child spans opened while it is current get it as parent."""
+
+    def __init__(self, name: str, kind: int, parent: Optional["Span"], attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else ""
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.end = None
+        self.status = {"code": STATUS_OK}
+
+    def set(self, attributes: dict):
+        """Add attributes (token counts, payload sizes...) to the span."""
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException):
+        self.status = {"code": STATUS_ERROR, "message": f"{type(error).__name__}: {error}"}
+
+    def to_otlp(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": self.status,
+        }
+
+
+class _NoSpan:
+    """Stands in for a span when tracing is off."""
+
+    def set(self, attributes: dict):
+        pass
+
+    def fail(self, error: BaseException):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """
+    Nested spans of a chat request: chat_request > graph node > LLM call / tool
+    > TTS refinement > Kokoro synthesis > formatting, plus checkpoint writes.
+
+    The current span is kept in a context variable, so nesting follows the code
+    across `await`, asyncio tasks and `asyncio.to_thread` (thread pools that do
+    not copy the context need `contextvars.copy_context().run`). Concurrent
+    tool calls are sibling spans.
+
+    Every finished span is queued to the log writer as one OTLP/JSON
+    ExportTraceServiceRequest line of `traces.jsonl` (the format read by the
+    OpenTelemetry Collector `otlpjsonfile` receiver, which can forward it to
+    Jaeger, Tempo...).
+    """
+
+    def __init__(self, enabled: bool = True, service_name: str = "ai-assistant", stream: str = "traces"):
+        self.enabled = enabled
+        self.stream = stream
+        self._resource = {"attributes": _otlp_attributes({"service.name": service_name})}
+        self._scope = {"name": "log_module.tracing"}
+
+    @contextmanager
+    def span(self, name: str, attributes: dict = None, kind: int = INTERNAL):
+        if not self.enabled:
+            yield _NO_SPAN
+            return
+
+        span = Span(name, kind, _current_span.get(), dict(attributes or {}))
+        token = _current_span.set(span)
+        try:
+            yield span
+        except GeneratorExit:
+            raise  # stream closed by its consumer
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            span.end = time.time_ns()
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Left in another context (async generator closed by another task)
+                pass
+            self._export(span)
+
+    def _export(self, span: Span):
+        get_log_writer().write(self.stream, {
+            "resourceSpans": [{
+                "resource": self._resource,
+                "scopeSpans": [{"scope": self._scope, "spans": [span.to_otlp()]}],
+            }]
+        })
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer (disabled unless TRACING is set)."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(enabled=Settings.TRACING, service_name=Settings.SERVICE_NAME)
+        return _tracer
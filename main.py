@@ -1,11 +1,32 @@
-from fastapi import FastAPI
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
-from chat import ChatManager, MessageRequest, ResponseMessage
+from chat import ChatManager, DeferredTTSResponse, MessageRequest, ResponseMessage
 from config.settings import Settings
+from log_module.metrics import get_metrics
+from tts.audio_store import AUDIO_FORMATS, SAMPLE_RATE, SAMPLE_RATES, get_audio_store, parse_range
+from tts.deferred import get_deferred_tts
 
 chat_manager = ChatManager()
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    retention = None
+    if Settings.MEMORY_RETENTION_INTERVAL:
+        retention = asyncio.create_task(chat_manager.run_memory_retention())
+    yield
+    if retention is not None:
+        retention.cancel()
+    await chat_manager.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 settings = Settings()
 
 # Allow frontend CORS
@@ -14,12 +35,95 @@ app.add_middleware(
     allow_origins=["http://localhost:5501"],  # you can later restrict this
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Content-Range", "Accept-Ranges"],
 )
 
 
 @app.post("/chat", response_model=ResponseMessage)
-def chat(request: MessageRequest):
-    return chat_manager.process_message(message=request.message, language=request.language, sender="human")
+async def chat(request: MessageRequest):
+    return await chat_manager.aprocess_message(
+        message=request.message,
+        language=request.language,
+        sender="human",
+        session_id=request.session_id,
+        defer_tts=request.defer_tts,
+    )
+
+
+@app.get("/tts/{handle}", response_model=DeferredTTSResponse)
+async def get_deferred_tts_status(handle: str, wait: float = 0):
+    """Audio of a deferred /chat turn. `wait` long-polls for up to that many seconds (max 60)."""
+    result = await get_deferred_tts().wait(handle, timeout=min(max(wait, 0), 60))
+    if result is None:
+        raise HTTPException(status_code=404, detail="TTS job not found")
+    return result
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: MessageRequest):
+    """Server-sent events: token, tool_start, tool_end, interrupt, final (a ResponseMessage)."""
+
+    async def event_stream():
+        try:
+            async for event, data in chat_manager.astream_message(
+                message=request.message,
+                language=request.language,
+                sender="human",
+                session_id=request.session_id,
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/audio/{audio_id}")
+def get_audio(
+    audio_id: str,
+    format: str = "wav",
+    sample_rate: int = SAMPLE_RATE,
+    range: str | None = Header(default=None),
+):
+    """Synthesized speech as wav (16-bit PCM), pcm (raw s16le) or ogg (Opus), with byte range support."""
+    if format not in AUDIO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(AUDIO_FORMATS)}")
+    if sample_rate not in SAMPLE_RATES:
+        raise HTTPException(status_code=400, detail=f"sample_rate must be one of {list(SAMPLE_RATES)}")
+
+    try:
+        audio = get_audio_store().get(audio_id, format, sample_rate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=3600"}
+    media_type = AUDIO_FORMATS[format]
+    if format == "pcm":
+        media_type += f";rate={sample_rate};channels=1"
+
+    if range is None:
+        return Response(content=audio, media_type=media_type, headers=headers)
+
+    byte_range = parse_range(range, len(audio))
+    if byte_range is None:
+        raise HTTPException(
+            status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{len(audio)}"}
+        )
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(audio)}"
+    return Response(content=audio[start : end + 1], status_code=206, media_type=media_type, headers=headers)
+
+
+@app.get("/metrics")
+def metrics():
+    """Stage latencies, token and session counters in the Prometheus text format."""
+    return Response(get_metrics().render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/config")
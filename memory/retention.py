@@ -0,0 +1,150 @@
+import argparse
+import os
+import sqlite3
+import time
+import uuid
+from typing import Iterable
+
+DB_PATH = "memory/memory.db"
+
+# 100 ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """Unix time of a checkpoint, read from its id (LangGraph ids are UUIDv6, time ordered)."""
+    value = uuid.UUID(checkpoint_id).int
+    timestamp = ((value >> 96) << 28) | (((value >> 80) & 0xFFFF) << 12) | ((value >> 64) & 0x0FFF)
+    return (timestamp - UUID_EPOCH_OFFSET) / 1e7
+
+
+def db_size(db_path: str) -> int:
+    """Bytes on disk: the database file plus its WAL."""
+    return sum(os.path.getsize(path) for path in (db_path, f"{db_path}-wal") if os.path.exists(path))
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection):
+    """Switch the database to auto_vacuum=INCREMENTAL (needs one full VACUUM, only the first time)."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def idle_threads(conn: sqlite3.Connection, ttl: float, now: float) -> list[str]:
+    """Threads whose last checkpoint is older than `ttl` seconds."""
+    rows = conn.execute("SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id").fetchall()
+    return [thread_id for thread_id, checkpoint_id in rows if now - checkpoint_time(checkpoint_id) > ttl]
+
+
+def prune_memory(
+    db_path: str = DB_PATH,
+    keep: int = 5,
+    thread_ttl: float = 0,
+    exclude: Iterable[str] = (),
+    dry_run: bool = False,
+) -> dict:
+    """
+    Bound the size of the checkpointer database.
+
+    - Threads whose last checkpoint is older than `thread_ttl` seconds are
+      deleted (0 keeps every thread), except the ones in `exclude` (live sessions).
+    - Every other thread keeps its latest `keep` checkpoints (0 keeps them all);
+      the pending writes of the deleted checkpoints go with them.
+    - Freed pages are returned to the file system with an incremental VACUUM.
+
+    Returns a report: deleted threads (count and `thread_ids`) / checkpoints /
+    writes, size on disk (database + WAL) before and after, reclaimed bytes and
+    duration. The size after is measured once the WAL is checkpointed and the
+    free pages are vacuumed; `reclaimed` is 0 when the file did not shrink (e.g.
+    PRAGMA optimize added planner statistics).
+    """
+    start = time.perf_counter()
+    threads, checkpoints, writes = [], 0, 0
+    exclude = set(exclude)
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        if not {"checkpoints", "writes"} <= tables:  # no session saved yet
+            keep, thread_ttl, dry_run = 0, 0, True
+        elif not dry_run:
+            enable_incremental_vacuum(conn)
+        size_before = db_size(db_path)
+
+        if thread_ttl:
+            threads = [t for t in idle_threads(conn, thread_ttl, time.time()) if t not in exclude]
+        with conn:
+            for thread_id in threads:
+                checkpoints += conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)).rowcount
+                writes += conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,)).rowcount
+
+            if keep:
+                # Checkpoint ids sort by time: keep the newest `keep` of each thread
+                checkpoints += conn.execute(
+                    """
+                    DELETE FROM checkpoints WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, ROW_NUMBER() OVER (
+                                PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                            ) AS position
+                            FROM checkpoints
+                        ) WHERE position > ?
+                    )
+                    """,
+                    (keep,),
+                ).rowcount
+                writes += conn.execute(
+                    """
+                    DELETE FROM writes WHERE NOT EXISTS (
+                        SELECT 1 FROM checkpoints c
+                        WHERE c.thread_id = writes.thread_id
+                          AND c.checkpoint_ns = writes.checkpoint_ns
+                          AND c.checkpoint_id = writes.checkpoint_id
+                    )
+                    """
+                ).rowcount
+
+            if dry_run:
+                conn.rollback()
+
+        if not dry_run:
+            conn.executescript("PRAGMA incremental_vacuum;")  # execute() would step it once: one page
+            conn.execute("PRAGMA optimize")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size_after = db_size(db_path)
+    finally:
+        conn.close()
+
+    return {
+        "threads": len(threads),
+        "thread_ids": threads,
+        "checkpoints": checkpoints,
+        "writes": writes,
+        "size_before": size_before,
+        "size_after": size_after,
+        "reclaimed": max(size_before - size_after, 0),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def format_report(report: dict) -> str:
+    return (
+        f"THREADS: {report['threads']} | CHECKPOINTS: {report['checkpoints']} | WRITES: {report['writes']} | "
+        f"SIZE: {report['size_before'] / 1e6:.2f} -> {report['size_after'] / 1e6:.2f} MB | "
+        f"RECLAIMED: {report['reclaimed'] / 1e6:.2f} MB | {report['seconds']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    from config.settings import Settings
+
+    parser = argparse.ArgumentParser(description="Prune old checkpoints and threads from memory.db")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--keep", type=int, default=Settings.MEMORY_KEEP_CHECKPOINTS,
+                        help="checkpoints kept per thread (0 keeps all)")
+    parser.add_argument("--thread-ttl", type=float, default=Settings.MEMORY_THREAD_TTL,
+                        help="seconds without a checkpoint before a thread is deleted (0 keeps all)")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be deleted, delete nothing")
+    args = parser.parse_args()
+
+    report = prune_memory(args.db, keep=args.keep, thread_ttl=args.thread_ttl, dry_run=args.dry_run)
+    print(f"{'🔍 Dry run' if args.dry_run else '🧹 memory.db pruned'} | {format_report(report)}")
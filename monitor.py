@@ -1,19 +1,30 @@
 import streamlit as st
-import pandas as pd
 import time
-import os
+
+from log_module.log_tail import TimeLogMonitor, TokenUsageMonitor
 
 st.set_page_config(layout="wide")
 st.title("🔍 Real-Time Token Usage Monitor")
 
-token_log_path  = "log_module/token_usage_log.csv"
-time_log_path = "log_module/time_log.csv"
+# JSON Lines logs written by the agent (log_module/log_writer.py)
+token_log_path  = "log_module/token_usage_log.jsonl"
+time_log_path = "log_module/time_log.jsonl"
+
+# Rows kept at full resolution for the charts; older rows are downsampled
+RECENT_ROWS = 2000
+HISTORY_BINS = 1000
+
+
+@st.cache_resource
+def get_monitors(token_log_path: str, time_log_path: str):
+    """Kept across reruns: every refresh only reads the lines appended since the previous one."""
+    return (
+        TokenUsageMonitor(token_log_path, RECENT_ROWS, HISTORY_BINS),
+        TimeLogMonitor(time_log_path, RECENT_ROWS, HISTORY_BINS),
+    )
+
 
-# Show warning if file doesn't exist yet
-if not os.path.exists(token_log_path ):
-    st.warning("Token log file not found. Waiting for agent to start...")
-    time.sleep(3)  # Small delay before rechecking
-    st.rerun()()
+token_monitor, time_monitor = get_monitors(token_log_path, time_log_path)
 
 # Sidebar refresh control
 refresh_interval = st.sidebar.slider("Refresh interval (seconds)", 2, 30, 2)
@@ -26,25 +37,32 @@ x_axis_mode = st.sidebar.radio(
 # Main placeholders
 input_output_chart_placeholder = st.empty()
 cumulative_chart_placeholder = st.empty()
+prefix_cache_chart_placeholder = st.empty()
 stats_placeholder = st.empty()
+sessions_placeholder = st.empty()
 time_log_chart_placeholder = st.empty()
 
 while True:
     try:
-        df = pd.read_csv(token_log_path )
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df["cumulative_tokens"] = df["total_tokens"].cumsum()
+        token_monitor.update()
+        time_monitor.update()
 
-        if x_axis_mode == "Timestamps":
-            df_plot = df.set_index("timestamp")
-        else:
-            df["step"] = range(len(df))
-            df_plot = df.set_index("step")
+        # Show warning if there is no token usage yet
+        if not token_monitor.rows:
+            stats_placeholder.warning("Token log file not found. Waiting for agent to start...")
+            time.sleep(3)  # Small delay before rechecking
+            continue
+
+        df = token_monitor.series.frame()
+        df_plot = df.set_index("timestamp" if x_axis_mode == "Timestamps" else "step")
+        downsampled = token_monitor.series.bin_size > 1
 
         # Input / Output tokens chart
         with input_output_chart_placeholder.container():
             st.subheader("Input and Output Tokens (LLM Assistant)")
-            st.bar_chart(df_plot[["input_tokens","output_tokens"]], 
+            if downsampled:
+                st.caption(f"Older calls averaged over bins of {token_monitor.series.bin_size} calls")
+            st.bar_chart(df_plot[["input_tokens","output_tokens"]],
                          stack=False,
                          y_label="Nº Tokens")
 
@@ -55,29 +73,46 @@ while True:
             st.line_chart(df_plot[["cumulative_tokens"]],
                           y_label="Nº Tokens (sum)")
 
+        # Prefix cache hit rate chart (prompt tokens served from the model server cache)
+        with prefix_cache_chart_placeholder.container():
+            st.subheader("Prompt Prefix Cache Hit Rate")
+            st.line_chart(df_plot[["prefix_cache_hit_rate"]],
+                          y_label="Cached / Input tokens")
+
         # Stats
-        latest = df.iloc[-1]
-        total = df["total_tokens"].sum()
+        latest = token_monitor.latest
+        totals = token_monitor.totals
         with stats_placeholder.container():
             st.markdown("### 📊 Latest Stats")
-            st.write(f"**Last input tokens:** {latest['input_tokens']}")
-            st.write(f"**Last output tokens:** {latest['output_tokens']}")
-            st.write(f"**Cumulative tokens so far:** {int(total)}")
-            
-         # --- Time Log Visualization ---
-        if os.path.exists(time_log_path):
-            time_df = pd.read_csv(time_log_path)
-            time_df["timestamp"] = pd.to_datetime(time_df["timestamp"])
-            time_df["step"] = range(len(time_df))
+            st.write(f"**Last input tokens:** {int(latest['input_tokens'])}")
+            st.write(f"**Last output tokens:** {int(latest['output_tokens'])}")
+            st.write(f"**Cumulative tokens so far:** {totals['total_tokens']}")
+            st.write(f"**Context tokens saved so far:** {totals['saved_tokens']}")
+            if totals["input_tokens"]:
+                st.write(f"**Last cached prompt tokens:** {int(latest['cached_tokens'])}")
+                st.write(f"**Prefix cache hit rate so far:** {totals['cached_tokens'] / totals['input_tokens']:.0%}")
+            st.write(f"**LLM calls logged:** {token_monitor.rows}")
+
+        # Per-session token usage
+        with sessions_placeholder.container():
+            st.subheader("🧑‍💻 Token Usage per Session")
+            st.dataframe(token_monitor.sessions.sort_values("last_seen", ascending=False))
 
+         # --- Time Log Visualization ---
+        if time_monitor.rows:
             with time_log_chart_placeholder.container():
                 st.subheader("⏱️ Step Timing Log")
-                st.dataframe(time_df[["step", "label", "timestamp", "delta"]])
+                st.dataframe(time_monitor.series.tail(200)[["step", "label", "timestamp", "delta"]])
 
                 # Optional: show a bar chart of step durations
-                st.bar_chart(data=time_df.set_index("step")[["delta"]],
+                st.bar_chart(data=time_monitor.series.frame().set_index("step")[["delta"]],
                              y_label="Duration (seconds)")
 
+                st.subheader("Time per Stage")
+                st.dataframe(time_monitor.stages())
+                st.subheader("Time per Session and Stage")
+                st.dataframe(time_monitor.session_stages())
+
 
         time.sleep(refresh_interval)
 
@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Optional
+
+from termcolor import colored
+
+from config.settings import Settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    taskId TEXT NOT NULL UNIQUE,
+    taskDescription TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    registerDate TEXT,
+    dueDate TEXT  -- NULL: "never"
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks (dueDate);
+CREATE INDEX IF NOT EXISTS idx_tasks_register_date ON tasks (registerDate);
+"""
+SCHEMA_VERSION = 1
+DATE_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d")
+STATUSES = ("open", "completed", "all")
+
+
+def parse_date(value: str) -> str:
+    """Validate a 'YYYY-MM-DD[ HH:MM]' date. Dates are stored as text, so they compare as strings."""
+    for date_format in DATE_FORMATS:
+        try:
+            datetime.strptime(value.strip(), date_format)
+            return value.strip()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date '{value}', use YYYY-MM-DD or YYYY-MM-DD HH:MM.")
+
+
+def task_from_row(row: sqlite3.Row) -> dict:
+    """Task in the to-do list JSON format."""
+    return {
+        "taskId": row["taskId"],
+        "taskDescription": row["taskDescription"],
+        "Completed": bool(row["completed"]),
+        "registerDate": row["registerDate"],
+        "dueDate": row["dueDate"] or "never",
+    }
+
+
+class ToDoStore:
+    """
+    To-do list in SQLite: indexed columns, one transaction per write and a read
+    cache of the query results (the last `max_cached` queries), dropped on every
+    write (ours or, through PRAGMA data_version, another connection's).
+
+    The first time the database is created, the tasks of the legacy JSON file
+    are imported (`registerTime` keys are read as `registerDate`).
+    """
+
+    def __init__(self, db_path: str, json_path: Optional[str] = None, max_cached: int = 64):
+        self.db_path = db_path
+        self.json_path = json_path
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()  # query -> (tasks, total)
+        self._cache_version = None
+
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._migrate_json()
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_json(self):
+        """Import the tasks of the legacy JSON file. Caller holds the lock, inside a transaction."""
+        if not self.json_path or not os.path.exists(self.json_path):
+            return
+        with open(self.json_path, encoding="utf-8") as file:
+            to_do_list = json.load(file)
+
+        rows = [
+            (
+                str(task.get("taskId") or uuid.uuid4()),
+                task.get("taskDescription", ""),
+                int(bool(task.get("Completed", False))),
+                task.get("registerDate") or task.get("registerTime"),
+                None if task.get("dueDate") in (None, "", "never") else task["dueDate"],
+            )
+            for task in to_do_list
+        ]
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO tasks (taskId, taskDescription, completed, registerDate, dueDate) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        if Settings.VERBOSE:
+            print(colored(f"📝 Imported {len(rows)} tasks from {self.json_path}", "light_blue"))
+
+    def _invalidate(self):
+        self._cache.clear()
+
+    def query_tasks(
+        self,
+        status: str = "all",
+        due_before: Optional[str] = None,
+        due_after: Optional[str] = None,
+        text: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[list[dict], int]:
+        """
+        Filtered page of tasks, in insertion order. Returns (tasks, total matching).
+        Due date filters leave out tasks with no due date. Served from the cache
+        while nothing is written.
+        """
+        if status not in STATUSES:
+            raise ValueError(f"Invalid status '{status}', use one of {list(STATUSES)}.")
+
+        conditions, params = [], []
+        if status != "all":
+            conditions.append("completed = ?")
+            params.append(int(status == "completed"))
+        if due_before:
+            conditions.append("dueDate < ?")
+            params.append(parse_date(due_before))
+        if due_after:
+            conditions.append("dueDate > ?")
+            params.append(parse_date(due_after))
+        if text:
+            conditions.append("taskDescription LIKE ? ESCAPE '\\'")
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        key = (where, tuple(params), limit, offset)
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._cache_version:  # another connection wrote
+                self._invalidate()
+                self._cache_version = version
+
+            cached = self._cache.get(key)
+            if cached is None:
+                total = self._conn.execute(f"SELECT COUNT(*) FROM tasks {where}", params).fetchone()[0]
+                rows = self._conn.execute(
+                    f"SELECT * FROM tasks {where} ORDER BY position LIMIT ? OFFSET ?", params + [limit, offset]
+                ).fetchall()
+                cached = ([task_from_row(row) for row in rows], total)
+                self._cache[key] = cached
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(key)
+            tasks, total = cached
+            return [dict(task) for task in tasks], total
+
+    def add_task(self, description: str, due_date: Optional[str] = None) -> dict:
+        """Insert a new task and return it."""
+        task = {
+            "taskId": str(uuid.uuid4()),
+            "taskDescription": description,
+            "Completed": False,
+            "registerDate": datetime.today().strftime("%Y-%m-%d %H:%M"),
+            "dueDate": due_date or "never",
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO tasks (taskId, taskDescription, completed, registerDate, dueDate) VALUES (?, ?, 0, ?, ?)",
+                (task["taskId"], description, task["registerDate"], due_date),
+            )
+            self._invalidate()
+        return task
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[ToDoStore] = None
+_store_lock = Lock()
+
+
+def get_to_do_store() -> ToDoStore:
+    """Process-wide to-do list store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ToDoStore(Settings.TO_DO_LIST_DB, json_path=Settings.TO_DO_LIST_JSON)
+        return _store
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from chat.model_registry import ModelRegistry
+from chat.session import ChatSession
+from config.settings import Settings
+from images import generate_images
+
+
+class FakeLLM(GenericFakeChatModel):
+    """Answers every call with the same short text (no tool calls)."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = AIMessage(
+            content="Here is the answer.",
+            usage_metadata={"input_tokens": 5, "output_tokens": 4, "total_tokens": 9},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class FakeTTSGenerator:
+    """Stands in for Kokoro."""
+
+    cache = None
+
+    def generate_audio_id(self, text: str, save: bool = True) -> str:
+        return ""
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "VERBOSE", False)
+    monkeypatch.setattr(Settings, "LOGGING", None)
+    monkeypatch.setattr(ModelRegistry, "_create_llm", lambda self: FakeLLM(messages=iter([])))
+    monkeypatch.setattr(generate_images, "draw_mermaid", lambda graph: None)
+
+    registry = ModelRegistry(Settings(), memory_db_path=str(tmp_path / "memory.db"))
+    monkeypatch.setattr(registry, "get_tts_generator", lambda language: FakeTTSGenerator())
+    yield registry
+    registry.close()
+
+
+def test_rehydrated_deferred_turn_takes_a_new_message(registry, monkeypatch):
+    """A deferred turn whose TTS timed out leaves the thread paused without an interrupt:
+    once the session is evicted and rehydrated, the next message must not be sent as a resume."""
+    session = ChatSession(Settings(), registry=registry, language="EN")
+    monkeypatch.setattr(Settings, "TTS_DEFERRED_TIMEOUT", 0)  # final_response_node never runs
+
+    async def deferred_turn():
+        await session.achat("Hello.", "EN", defer_tts=True)
+        await session.wait_background()
+
+    asyncio.run(deferred_turn())
+    snapshot = registry.get_agent("EN").graph.get_state(session._config)
+    assert snapshot.next == ("final_response_node",)
+    assert not any(task.interrupts for task in snapshot.tasks)
+
+    # Evicted, then rehydrated from its thread
+    restored = ChatSession(Settings(), registry=registry, thread_id=session.thread_id, language="EN")
+    assert not restored._interrupted
+
+    restored.chat("And now?", "EN")
+    restored.join_background()
+    human_messages = [m.content for m in restored._state["_messages"] if isinstance(m, HumanMessage)]
+    assert human_messages == ["Hello.", "And now?"]
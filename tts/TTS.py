@@ -1,9 +1,21 @@
 from kokoro import KPipeline
 import soundfile as sf
+import numpy as np
 import torch
+import asyncio
 import io
+import re
 import base64
+from collections import deque
+from threading import Lock
 from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from log_module.metrics import get_metrics
+from log_module.tracing import get_tracer
+from tts.audio_store import SAMPLE_RATE, audio_url, get_audio_store
+from tts.cache import TTSCache, get_tts_cache
+from tts.worker_pool import TTSRequest, get_tts_pool
 
  # Input text
 # text = '''
@@ -12,78 +24,208 @@ LANGUAGES = {'ES':'e', 'EN': 'a'}
 
 class TTSGenerator:
     def __init__(self, tts_language:str="EN"):
-        
-        # Initialize the TTS pipeline
-        self.pipeline = KPipeline(repo_id='hexgrad/Kokoro-82M', lang_code=LANGUAGES.get(tts_language,'a'), device ='cuda' if torch.cuda.is_available() else 'cpu')
+
         self.voice = "am_adam" if tts_language == "EN" else "em_alex"
-        
-    def generate(self, text:str, save:bool = True, split_pattern:str='') -> list[dict]:
+        self.speed = 0.9
+        self.lang_code = LANGUAGES.get(tts_language,'a')
+        self.cache = get_tts_cache()
+
+        # Synthesis runs in the worker pool when there is one, otherwise inline
+        self.pool = get_tts_pool()
+        self.pipeline = None
+        self._pipeline_lock = Lock()  # the generator is shared between sessions
+        if self.pool is None:
+            # Initialize the TTS pipeline
+            self.pipeline = KPipeline(repo_id='hexgrad/Kokoro-82M', lang_code=self.lang_code, device ='cuda' if torch.cuda.is_available() else 'cpu')
+
+    def synthesize(self, text:str, split_pattern:str='') -> np.ndarray:
         """
-        Generate TTS audio from text with optional base64 encoding and saving.
+        Run Kokoro on `text` and return the audio of every segment, concatenated.
         Args:
             text (str): The input text to synthesize.
-            b64 (bool): Whether to return audio as base64 encoded string.
-            save (bool): Whether to save the audio files to disk.
+            split_pattern (str): Pattern used by Kokoro to split the text. If empty, no splitting is done.
+        Returns:
+            np.ndarray: Float audio at SAMPLE_RATE (empty if there is nothing to say).
+        """
+        if not text.strip():
+            return np.zeros(0, dtype=np.float32)
+
+        with get_tracer().span("tts_synthesis", {"tts.text_chars": len(text), "tts.voice": self.voice}) as span:
+            if self.cache is not None:
+                key = TTSCache.key(text, self.voice, self.speed, self.lang_code, split_pattern)
+                audio = self.cache.get(key)
+                if audio is not None:
+                    span.set({"tts.cache_hit": True, "tts.audio_seconds": audio.size / SAMPLE_RATE})
+                    return audio
+
+            text = TTSCache.normalize(text)
+            with get_metrics().stage_seconds.time(stage="tts_synthesis"), get_tracer().span("kokoro"):
+                if self.pool is not None:
+                    audio = self.pool.synthesize(TTSRequest(text, self.lang_code, self.voice, self.speed, split_pattern))
+                else:
+                    with self._pipeline_lock:
+                        generator = self.pipeline(text=text, voice=self.voice, speed=self.speed, split_pattern=split_pattern)
+                        segments = [np.asarray(audio, dtype=np.float32) for _, _, audio in generator if audio is not None]
+                    audio = np.concatenate(segments) if segments else np.zeros(0, dtype=np.float32)
+            span.set({"tts.cache_hit": False, "tts.audio_seconds": audio.size / SAMPLE_RATE})
+
+            if self.cache is not None and audio.size:
+                self.cache.put(key, audio)
+            return audio
+
+    def prewarm(self, phrases: Iterable[str]):
+        """Synthesize `phrases` ahead of time so they are served from the cache."""
+        for phrase in phrases:
+            self.synthesize(phrase)
+
+    @staticmethod
+    def encode_wav(audio: np.ndarray) -> bytes:
+        """Encode float audio as WAV bytes."""
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, SAMPLE_RATE, format='WAV')
+        return buffer.getvalue()
+
+    def generate(self, text:str, save:bool = True, split_pattern:str='') -> str:
+        """
+        Generate TTS audio from text, base64 encoded.
+        Args:
+            text (str): The input text to synthesize.
+            save (bool): Whether to save the audio file to disk.
             split_pattern (str): Pattern to split the audio. If empty, no splitting is done.
         Returns:
-            list[dict]: A list of dictionaries containing split audio results.
-            
-        If split_pattern = '', the entire audio will be processed as a single unit and the list will contain one dictionary with the full audio.
+            str: Base64 encoded WAV with the audio of all the segments ("" if there is nothing to say).
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20250620_173245
-        # Generate audio
-
-        generator = self.pipeline(text=text, voice=self.voice, speed=0.9, split_pattern=split_pattern)
-        
-        results = []
-        
-        for i, (gs, ps, audio) in enumerate(generator):
-            
-            split_result = {
-                'split_index': i,
-                'graphemes': gs,
-                'phonemes': ps,
-                'audio_b64' : ""
-            }
-            
-            
-            buffer = io.BytesIO()
-            sf.write(buffer, audio, 24000, format='WAV')
-            buffer.seek(0)
-            audio_b64 = base64.b64encode(buffer.read()).decode('utf-8')
-            split_result['audio_b64'] = audio_b64
-            #print(f"Generated audio for split {i} with base64 encoding.")
-            
-            # if save: # Decode back for verification
-            #     audio_bytes = base64.b64decode(audio_b64)
-            #     reconstructed_path = f'tts/{timestamp}_{self.voice}_{i}_reconstructed.wav'
-            #     with open(reconstructed_path, 'wb') as f:
-            #         f.write(audio_bytes)
-            #     print(f"Saved reconstructed audio to {reconstructed_path}")
-                
+
+        audio = self.synthesize(text, split_pattern=split_pattern)
+        if not audio.size:
+            return ""
+
+        if save:
+            original_path = f'tts/{timestamp}.wav'
+            sf.write(original_path, audio, SAMPLE_RATE)
+            #print(f"Saved original audio to {original_path}")
+
+        return base64.b64encode(self.encode_wav(audio)).decode('utf-8')
+
+    def generate_audio_id(self, text:str, save:bool = True) -> str:
+        """
+        Generate TTS audio from text and keep it in the audio store, served by /audio/{id}.
+        Returns:
+            str: Id of the stored clip ("" if there is nothing to say).
+        """
+        with get_tracer().span("tts_audio", {"tts.text_chars": len(text), "tts.save": save}) as span:
+            audio = self.synthesize(text)
+            if not audio.size:
+                return ""
+
             if save:
-                original_path = f'tts/{timestamp}_{i}.wav'
-                sf.write(original_path, audio, 24000)
-                #print(f"Saved original audio to {original_path}")
-                
-            results.append(split_result)
-            
-        tts_base64 = results[0].get("audio_b64", "")
-            
-        return tts_base64         
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20250620_173245
+                sf.write(f'tts/{timestamp}.wav', audio, SAMPLE_RATE)
 
+            span.set({"tts.audio_bytes": audio.nbytes})
+            return get_audio_store().put(audio)
 
-# if __name__ == "__main__":
-#     tts = TTSGenerator()
-#     output = tts.generate(text, save=True)
-#     print("TTS synthesis completed and saved.")
-    
-#     print("Output:", output)
 
-        
+class SentenceSplitter:
+    """Cuts a stream of text deltas into complete sentences."""
+
+    # End of sentence: punctuation followed by whitespace, or a line break
+    BOUNDARY = re.compile(r'(?<=[.!?;:])\s+|\n+')
+
+    def __init__(self, min_chars:int=20):
+        self.min_chars = min_chars  # shorter sentences are merged with the next one
+        self._buffer = ""
+
+    def feed(self, text:str) -> list[str]:
+        """Add a text delta and return the sentences it completes."""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(self._buffer):
+            sentence = self._buffer[start:match.start()].strip()
+            if len(sentence) < self.min_chars:
+                continue
+            sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the stream is over."""
+        sentence, self._buffer = self._buffer.strip(), ""
+        return sentence or None
+
+
+class TTSStream:
+    """
+    Sentence-streamed synthesis: text is fed as it is generated, each complete
+    sentence is synthesized in a worker thread (one at a time, in order) and the
+    audio chunks are handed out in sentence order.
+
+    Chunks are dicts: {'index': int, 'text': str, 'audio_url': str} (see /audio/{id}).
+    Must be used from a running event loop.
+    """
+
+    def __init__(self, generator: TTSGenerator, formatter: Callable[[str], str] = None):
+        self._generator = generator
+        self._formatter = formatter
+        self._splitter = SentenceSplitter()
+        self._pending: deque = deque()
+        self._previous: asyncio.Task = None
+        self.sentences = 0
+
+    def feed(self, text:str):
+        for sentence in self._splitter.feed(text):
+            self._schedule(sentence)
 
-            
-        
+    def close(self):
+        """Schedule the last (unterminated) sentence."""
+        sentence = self._splitter.flush()
+        if sentence:
+            self._schedule(sentence)
 
+    def _schedule(self, sentence:str):
+        if self._formatter:
+            sentence = self._formatter(sentence).strip()
+        if not sentence:
+            return
 
+        previous = self._previous
 
+        async def synthesize():
+            if previous is not None:
+                await asyncio.wait([previous])  # keep Kokoro busy with one sentence at a time
+            audio_id = await asyncio.to_thread(self._generator.generate_audio_id, sentence, False)
+            return audio_url(audio_id)
+
+        task = asyncio.create_task(synthesize())
+        self._pending.append((self.sentences, sentence, task))
+        self._previous = task
+        self.sentences += 1
+
+    def _chunk(self, index:int, sentence:str, task: asyncio.Task) -> dict:
+        url = "" if task.exception() else task.result()
+        return {'index': index, 'text': sentence, 'audio_url': url}
+
+    def ready(self) -> list[dict]:
+        """Chunks already synthesized, in order, without waiting."""
+        chunks = []
+        while self._pending and self._pending[0][2].done():
+            chunks.append(self._chunk(*self._pending.popleft()))
+        return chunks
+
+    async def drain(self):
+        """Wait for the remaining chunks and yield them in order."""
+        while self._pending:
+            index, sentence, task = self._pending.popleft()
+            await asyncio.wait([task])
+            yield self._chunk(index, sentence, task)
+
+
+# if __name__ == "__main__":
+#     tts = TTSGenerator()
+#     output = tts.generate(text, save=True)
+#     print("TTS synthesis completed and saved.")
+
+#     print("Output:", output)
@@ -0,0 +1,128 @@
+import io
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from config.settings import Settings
+
+SAMPLE_RATE = 24000  # Kokoro output
+
+# format -> media type
+AUDIO_FORMATS = {
+    "wav": "audio/wav",  # 16-bit PCM WAV
+    "pcm": "audio/L16",  # raw 16-bit little endian PCM, mono
+    "ogg": "audio/ogg",  # Ogg/Opus
+}
+# Rates a clip can be served at (the Opus rates): each clip keeps at most one encoding per (format, rate)
+SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def resample(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Linear resampling from SAMPLE_RATE to `sample_rate` (enough for speech)."""
+    if sample_rate == SAMPLE_RATE or not audio.size:
+        return audio
+    duration = len(audio) / SAMPLE_RATE
+    target = np.linspace(0, duration, int(duration * sample_rate), endpoint=False)
+    source = np.arange(len(audio)) / SAMPLE_RATE
+    return np.interp(target, source, audio).astype(np.float32)
+
+
+def encode_audio(audio: np.ndarray, audio_format: str = "wav", sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Encode float audio in one of AUDIO_FORMATS at `sample_rate`."""
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format '{audio_format}'. Use one of {list(AUDIO_FORMATS)}.")
+    if sample_rate not in SAMPLE_RATES:
+        raise ValueError(f"Unsupported sample rate {sample_rate}. Use one of {list(SAMPLE_RATES)}.")
+
+    audio = resample(audio, sample_rate)
+
+    if audio_format == "pcm":
+        return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    buffer = io.BytesIO()
+    if audio_format == "ogg":
+        sf.write(buffer, audio, sample_rate, format="OGG", subtype="OPUS")
+    else:
+        sf.write(buffer, audio, sample_rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+class AudioStore:
+    """
+    Bounded store of synthesized clips, served by the /audio/{id} endpoint.
+    Encodings are kept per (format, sample rate) so range requests on the
+    same clip do not re-encode it.
+    """
+
+    def __init__(self, max_clips: int = 256):
+        self.max_clips = max_clips
+        self._clips: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = Lock()
+
+    def put(self, audio: np.ndarray) -> str:
+        """Store a clip and return its id."""
+        audio_id = uuid.uuid4().hex
+        with self._lock:
+            self._clips[audio_id] = {"audio": audio, "encoded": {}}
+            while len(self._clips) > self.max_clips:
+                self._clips.popitem(last=False)
+        return audio_id
+
+    def get(self, audio_id: str, audio_format: str = "wav", sample_rate: int = SAMPLE_RATE) -> Optional[bytes]:
+        """Encoded clip, or None if the id is unknown (or already evicted)."""
+        with self._lock:
+            clip = self._clips.get(audio_id)
+            if clip is None:
+                return None
+            encoded = clip["encoded"].get((audio_format, sample_rate))
+        if encoded is None:
+            encoded = encode_audio(clip["audio"], audio_format, sample_rate)
+            with self._lock:
+                clip["encoded"][(audio_format, sample_rate)] = encoded
+        return encoded
+
+
+def audio_url(audio_id: str) -> str:
+    """Relative URL of a stored clip ("" for no audio)."""
+    return f"/audio/{audio_id}" if audio_id else ""
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=start-end` range. Returns (start, end) inclusive,
+    or None when the range cannot be satisfied.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    try:
+        if not start:  # suffix range: last N bytes
+            length = int(end)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+_store: Optional[AudioStore] = None
+_store_lock = Lock()
+
+
+def get_audio_store() -> AudioStore:
+    """Process-wide audio store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AudioStore(max_clips=Settings.TTS_AUDIO_STORE_SIZE)
+        return _store
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+
+from config.settings import Settings
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio.
+
+    Entries are keyed on (normalized text, voice, speed, lang_code, split_pattern)
+    and kept in two tiers: a bounded in-memory LRU and a persistent on-disk
+    store (one .npy file per entry, also bounded, oldest files pruned first).
+    """
+
+    def __init__(self, cache_dir: str = "tts/cache", max_entries: int = 256, max_disk_entries: int = 2048):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk_entries = len(list(self.cache_dir.glob("*.npy")))
+        self._lock = Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace so trivially different strings share an entry."""
+        return " ".join(text.split())
+
+    @classmethod
+    def key(cls, text: str, voice: str, speed: float, lang_code: str, split_pattern: str = "") -> str:
+        content = "\x1f".join([cls.normalize(text), voice, f"{speed:.3f}", lang_code, split_pattern])
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npy"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+
+        path = self._path(key)
+        try:
+            audio = np.load(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, audio)
+        return audio
+
+    def put(self, key: str, audio: np.ndarray):
+        with self._lock:
+            self._remember(key, audio)
+
+        path = self._path(key)
+        if path.exists():
+            return
+        # One temp file per write: threads and processes missing the same key write side by side
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False) as file:
+            tmp_path = file.name
+            try:
+                np.save(file, audio)
+            except OSError:
+                file.close()
+                os.remove(tmp_path)
+                return  # disk full: the entry stays in memory only
+        if path.exists():
+            os.remove(tmp_path)  # lost the race, the same audio is already stored
+            return
+        os.replace(tmp_path, path)  # atomic: readers never see a partial file
+
+        with self._lock:
+            self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                self._prune_disk()
+
+    def _remember(self, key: str, audio: np.ndarray):
+        """Insert in the memory tier. Caller holds the lock."""
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self):
+        """Delete the oldest files down to 90% of the disk budget. Caller holds the lock."""
+        files = sorted(self.cache_dir.glob("*.npy"), key=lambda f: f.stat().st_mtime)
+        excess = len(files) - int(self.max_disk_entries * 0.9)
+        for file in files[:max(excess, 0)]:
+            file.unlink(missing_ok=True)
+        self._disk_entries = len(files) - max(excess, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries,
+            }
+
+
+_cache: Optional[TTSCache] = None
+_cache_lock = Lock()
+
+
+def get_tts_cache() -> Optional[TTSCache]:
+    """Process-wide TTS cache (None when disabled with TTS_CACHE_SIZE=0)."""
+    global _cache
+    if not Settings.TTS_CACHE_SIZE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache(
+                cache_dir=Settings.TTS_CACHE_DIR,
+                max_entries=Settings.TTS_CACHE_SIZE,
+                max_disk_entries=Settings.TTS_CACHE_DISK_SIZE,
+            )
+        return _cache
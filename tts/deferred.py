@@ -0,0 +1,71 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+# Job result: {"status": ..., "tts_text": str, "tts_audio_url": str}
+PENDING = "pending"  # refinement or synthesis still running
+READY = "ready"
+TIMEOUT = "timeout"  # gave up on the audio, the turn stays text-only
+FAILED = "failed"
+
+
+def deferred_result(status: str, tts_text: str = "", tts_audio_url: str = "") -> dict:
+    return {"status": status, "tts_text": tts_text, "tts_audio_url": tts_audio_url}
+
+
+class DeferredTTSStore:
+    """
+    Bounded store of TTS jobs that keep running after the text response was
+    sent (deferred mode of /chat). Clients poll them by handle: GET /tts/{handle}.
+    """
+
+    def __init__(self, max_jobs: int = 256):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+        self._lock = Lock()
+
+    def put(self, task: asyncio.Task) -> str:
+        """Register a job (a task resolving to a `deferred_result`) and return its handle."""
+        handle = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[handle] = task
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return handle
+
+    async def wait(self, handle: str, timeout: float = 0) -> Optional[dict]:
+        """
+        Result of a job, waiting up to `timeout` seconds for it (long polling).
+        None if the handle is unknown (or already evicted).
+        """
+        with self._lock:
+            task = self._jobs.get(handle)
+        if task is None:
+            return None
+        if not task.done() and timeout > 0:
+            await asyncio.wait([task], timeout=timeout)
+        if not task.done():
+            return deferred_result(PENDING)
+        if task.cancelled() or task.exception() is not None:
+            return deferred_result(FAILED)
+        return task.result()
+
+
+def deferred_url(handle: str) -> str:
+    """Relative URL of a deferred TTS job ("" for none)."""
+    return f"/tts/{handle}" if handle else ""
+
+
+_store: Optional[DeferredTTSStore] = None
+_store_lock = Lock()
+
+
+def get_deferred_tts() -> DeferredTTSStore:
+    """Process-wide deferred TTS store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DeferredTTSStore()
+        return _store
@@ -0,0 +1,205 @@
+import os
+import queue
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock, Semaphore, Thread
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from config.settings import Settings
+
+
+class TTSRequest(NamedTuple):
+    text: str
+    lang_code: str
+    voice: str
+    speed: float
+    split_pattern: str = ""
+
+
+# --------------------------
+# WORKER PROCESS
+# --------------------------
+
+_pipelines = {}
+
+
+def _init_worker(torch_threads: int):
+    """Worker initializer: split the CPU cores between the workers."""
+    import torch
+
+    torch.set_num_threads(torch_threads)
+
+
+def _get_pipeline(lang_code: str):
+    """KPipeline of the worker for `lang_code`, loaded once per process."""
+    if lang_code not in _pipelines:
+        import torch
+        from kokoro import KPipeline
+
+        _pipelines[lang_code] = KPipeline(
+            repo_id='hexgrad/Kokoro-82M',
+            lang_code=lang_code,
+            device='cuda' if torch.cuda.is_available() else 'cpu',
+        )
+    return _pipelines[lang_code]
+
+
+def _synthesize_batch(batch: list) -> list:
+    """Synthesize a batch of TTSRequest in the worker. Returns one float audio array per request."""
+    results = []
+    for request in batch:
+        pipeline = _get_pipeline(request.lang_code)
+        generator = pipeline(
+            text=request.text, voice=request.voice, speed=request.speed, split_pattern=request.split_pattern
+        )
+        segments = [np.asarray(audio, dtype=np.float32) for _, _, audio in generator if audio is not None]
+        results.append(np.concatenate(segments) if segments else np.zeros(0, dtype=np.float32))
+    return results
+
+
+# --------------------------
+# API PROCESS
+# --------------------------
+
+class TTSWorkerPool:
+    """
+    Pool of TTS worker processes, each with its own Kokoro pipelines.
+
+    Requests go through a submission queue. A dispatcher thread sends them to
+    the workers in batches: while every worker is busy, pending utterances (from
+    any session) pile up and leave together in the next batch, up to `batch_size`.
+
+    After `shutdown` every pending request fails with a RuntimeError, and so do
+    new submissions: no caller is left waiting on its future.
+    """
+
+    def __init__(self, workers: int = 2, batch_size: int = 8):
+        self.workers = workers
+        self.batch_size = batch_size
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),  # CUDA and torch threads do not survive fork
+            initializer=_init_worker,
+            initargs=(max(1, (os.cpu_count() or 1) // workers),),
+        )
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stopping = False
+        self._stopping_lock = Lock()
+        self._free_workers = Semaphore(workers)
+        self._dispatcher = Thread(target=self._dispatch, name="tts-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, request: TTSRequest) -> Future:
+        """Queue a request. The future resolves to the float audio array."""
+        future = Future()
+        with self._stopping_lock:
+            if self._stopping:
+                future.set_exception(RuntimeError("TTS worker pool is shut down"))
+            else:
+                self._queue.put((request, future))
+        return future
+
+    def synthesize(self, request: TTSRequest) -> np.ndarray:
+        return self.submit(request).result()
+
+    def _dispatch(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            # Wait for a free worker; meanwhile more requests can arrive
+            self._free_workers.acquire()
+            batch = [item]
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            requests = [request for request, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                batch_future = self._executor.submit(_synthesize_batch, requests)
+            except RuntimeError as e:  # executor shut down or broken
+                self._free_workers.release()
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            batch_future.add_done_callback(lambda done, futures=futures: self._resolve(done, futures))
+
+            self.batches += 1
+            self.requests += len(batch)
+            if stopping:
+                return
+
+    def _resolve(self, batch_future: Future, futures: list):
+        self._free_workers.release()
+        try:
+            error = batch_future.exception()
+        except CancelledError:  # still queued in the executor at shutdown
+            error = RuntimeError("TTS worker pool is shut down")
+        for i, future in enumerate(futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(batch_future.result()[i])
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "batches": self.batches,
+            "requests": self.requests,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def shutdown(self):
+        with self._stopping_lock:
+            if self._stopping:
+                return
+            self._stopping = True
+
+        # Fail the requests not sent to the workers yet, then stop the dispatcher
+        error = RuntimeError("TTS worker pool is shut down")
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(error)
+        self._queue.put(None)
+        self._dispatcher.join(timeout=5)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[TTSWorkerPool] = None
+_pool_lock = Lock()
+
+
+def get_tts_pool() -> Optional[TTSWorkerPool]:
+    """Process-wide TTS worker pool (None when TTS_WORKERS=0: synthesis runs inline)."""
+    global _pool
+    if not Settings.TTS_WORKERS:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = TTSWorkerPool(workers=Settings.TTS_WORKERS, batch_size=Settings.TTS_BATCH_SIZE)
+        return _pool
+
+
+def shutdown_tts_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None